@@ -1,86 +1,229 @@
-from flask import Flask, request, jsonify
-from main import run_genetic_algorithm, preprocess_data_once
+from flask import Blueprint, Flask, current_app, request, jsonify, Response, stream_with_context
+from main import run_genetic_algorithm, get_dataset, validate_run_params
+from jobs import JobManager
+from sweep import run_sweep
+from genetic_algorithm import InfeasibleScheduleError, ParameterError
+from matrices import MatrixError, compile_matrix
+from profiles import ProfileOverrideError
+from instrumentation import registry
+from responses import ResultFormatError, compress_response, conditional, format_result, requested_result_format
 import os
-import pandas as pd
+import json
 from flask_cors import CORS # type: ignore
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
+# the asynchronous job endpoints, whose jobs live in the process that accepted them (see gunicorn.conf.py)
+jobs_api = Blueprint('jobs', __name__)
 
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit for request size
+JOBS_ENABLED = os.environ.get('GA_JOBS', '1') != '0'
 
-# Use environment variable or config file for file path
-file_path = os.environ.get('DATA_FILE_PATH', 'data_bank.xlsx')
+# Upper bound on the scenarios of one sweep request, and on the worker processes running them (0: one per CPU)
+SWEEP_MAX_SCENARIOS = int(os.environ.get('SWEEP_MAX_SCENARIOS', 100))
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', 0))
 
-# Global variables for preprocessed data (lazy loading)
-preprocessed_data = {
-    'module_profile': None,
-    'dependencies': None,
-    'feasible_set': None
-}
+def create_app(warm_up=False, jobs=None):
+    # app factory; a pre-fork server (see wsgi.py) builds the app once in its master process with warm_up=True
+    # jobs: serve the job endpoints, GA_JOBS by default
+    app = Flask(__name__)
+    CORS(app)
+
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit for request size
+
+    app.register_blueprint(api)
+    if JOBS_ENABLED if jobs is None else jobs:
+        # Background workers for asynchronous GA jobs, their threads only start with the first job so forking after this is safe
+        app.extensions['job_manager'] = JobManager(run_genetic_algorithm,
+                                                   max_workers=int(os.environ.get('GA_JOB_WORKERS', 2)),
+                                                   max_finished_jobs=int(os.environ.get('GA_JOB_RETENTION', 100)))
+        app.register_blueprint(jobs_api)
+    app.after_request(compress_response)
+    if warm_up:
+        warm_up_app()
+    return app
+
+def warm_up_app():
+    # load the dataset (building its snapshot and shared arrays if needed) before the first request instead of during it
+    dataset = get_dataset()
+    print(f"Dataset {dataset['version'][:12]} loaded: {len(dataset['module_profile'])} modules")
+    return dataset
+
+def job_manager():
+    return current_app.extensions['job_manager']
 
 # Ensure data is only preprocessed when required
 def ensure_data_preprocessed():
-    if preprocessed_data['module_profile'] is None or preprocessed_data['dependencies'] is None:
-        module_profile, dependencies, feasible_set = preprocess_data_once()
-        preprocessed_data['module_profile'] = module_profile
-        preprocessed_data['dependencies'] = dependencies
-        preprocessed_data['feasible_set'] = feasible_set
-    return preprocessed_data
+    # the dataset comes from its compiled snapshot and is refreshed whenever the workbook changes;
+    # it is shared process-wide (and its per-period arrays across processes), so no per-request copy is made
+    return get_dataset()
 
 
-def prepare_matrix(matrix_dict, num_modules):
-    # Create an empty DataFrame with the appropriate dimensions
-    matrix = pd.DataFrame('-', index=[i+1 for i in range(num_modules)], columns=[i+1 for i in range(num_modules)])
-    
-    # Populate the DataFrame with the values from the matrix_dict
-    for key, value in matrix_dict.items():
-        predecessor, successor = key.split('-')
-        predecessor = int(predecessor.split(' ')[1])
-        successor = int(successor.split(' ')[1])
-        matrix.loc[predecessor, successor] = value
-    
-    return matrix
+# serialized /get-preprocessed-data body, rebuilt when the dataset version changes
+_preprocessed_body = (None, None)
+
+def preprocessed_body(dataset):
+    global _preprocessed_body
+    version, body = _preprocessed_body
+    if version != dataset['version']:
+        body = jsonify({'dependencies': dataset['dependencies']}).get_data()
+        _preprocessed_body = (dataset['version'], body)
+    return body
+
+def prepare_run_params(data, dataset):
+    # compile the interaction and information matrices once, up front; sweep scenarios only carry the ones they override
+    modules = sorted(dataset['dependencies'].keys())
+    for key in ('interactionMatrix', 'informationMatrix'):
+        if key in data:
+            data[key] = compile_matrix(data[key], modules, key)
+    return data
 
-@app.route('/run-ga', methods=['POST'])
+@api.route('/run-ga', methods=['POST'])
 def run_ga():
     try:
-        print(request.headers)  # Log the headers to inspect them
         data = request.json
-        
+        result_format = requested_result_format()
+
         # Ensure preprocessing is done before running GA
-        ensure_data_preprocessed()
+        dataset = ensure_data_preprocessed()
 
         # Prepare the interaction and information matrices
-        num_modules = len(preprocessed_data['dependencies'])
-        data['interactionMatrix'] = prepare_matrix(data['interactionMatrix'], num_modules=12)
-        data['informationMatrix'] = prepare_matrix(data['informationMatrix'], num_modules=12)
+        prepare_run_params(data, dataset)
 
-        print(f"Received data: {data}")
-        
         # Run the genetic algorithm with preprocessed data and input parameters
-        result = run_genetic_algorithm(data)
+        result = run_genetic_algorithm(data, dataset=dataset)
+
+        return jsonify(format_result(result, result_format))
+
+    except (MatrixError, ProfileOverrideError, ParameterError, ResultFormatError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    except InfeasibleScheduleError as e:
+        # the data and parameters admit no schedule at all, retrying will not help
+        return jsonify({'error': str(e)}), 422
 
-        return jsonify(result)
-    
     except Exception as e:
         # Return JSON even for errors
         return jsonify({'error': str(e)}), 500
 
-@app.route('/get-preprocessed-data', methods=['GET'])
+@api.route('/get-preprocessed-data', methods=['GET'])
 def get_preprocessed_data():
     try:
         # Preprocess data if it hasn't been done already
         processed_data = ensure_data_preprocessed()
-        return jsonify({'dependencies': processed_data['dependencies']})
+        # the body only changes with the dataset version, so polling clients revalidate it and mostly get a 304
+        return conditional(processed_data['version'], lambda: Response(preprocessed_body(processed_data), mimetype='application/json'),
+                           processed_data.get('modified'))
     
     except Exception as e:
         # Return JSON even for errors
         return jsonify({'error': str(e)}), 500
     
-@app.route('/ws', methods=['GET'])
+@api.route('/sweep', methods=['POST'])
+def sweep():
+    try:
+        # the body holds the base params plus a list of scenarios, each overriding some of them
+        data = request.json
+        scenarios = data.pop('scenarios', None)
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({'error': 'scenarios must be a non-empty list'}), 400
+        if len(scenarios) > SWEEP_MAX_SCENARIOS:
+            return jsonify({'error': f'At most {SWEEP_MAX_SCENARIOS} scenarios per sweep'}), 400
+
+        dataset = ensure_data_preprocessed()
+        base_params = prepare_run_params(data, dataset)
+        scenarios = [prepare_run_params(dict(scenario), dataset) for scenario in scenarios]
+        for scenario in scenarios:
+            validate_run_params(dict(base_params, **scenario))
+        return jsonify(run_sweep(base_params, scenarios, dataset=dataset, max_workers=SWEEP_WORKERS or None))
+
+    except (MatrixError, ProfileOverrideError, ParameterError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_api.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        data = request.json
+        dataset = ensure_data_preprocessed()
+        validate_run_params(data)
+        job = job_manager().submit(prepare_run_params(data, dataset))
+        return jsonify(job.to_dict()), 202, {'Location': f'/jobs/{job.id}'}
+
+    except (MatrixError, ProfileOverrideError, ParameterError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@jobs_api.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager().cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 202
+
+@jobs_api.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == 'completed':
+        # a completed job's result never changes
+        try:
+            result_format = requested_result_format()
+        except ResultFormatError as e:
+            return jsonify({'error': str(e)}), 400
+        return conditional(f'{job.id}-{result_format}', lambda: jsonify(format_result(job.result, result_format)))
+    if job.status == 'failed':
+        return jsonify({'error': job.error}), 500
+    return jsonify(job.to_dict()), 409
+
+@jobs_api.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    job = job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    # resume after the last event the client has seen, if it reconnects; from the start when the id is not one we sent
+    try:
+        start = max(0, int(request.headers.get('Last-Event-ID', -1)) + 1)
+    except ValueError:
+        start = 0
+
+    def generate():
+        position = start
+        while True:
+            events = job.wait_for_events(position)
+            if not events:
+                yield ': keep-alive\n\n'
+            for event, data in events:
+                yield f'id: {position}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+                position += 1
+            if job.finished and position >= len(job.events):
+                return
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition of the run totals plus the current job queue
+    manager = current_app.extensions.get('job_manager')
+    return Response(registry.render(manager.status_counts() if manager else None), mimetype='text/plain; version=0.0.4')
+
+@api.route('/ws', methods=['GET'])
 def websocket_dummy():
     return '', 200  # Return an empty response with a 200 OK status
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000) 
+    # development server; production serves wsgi:app with gunicorn (see gunicorn.conf.py)
+    create_app().run(debug=True, port=5000)
+
@@ -0,0 +1,192 @@
+# Micro- and macro-benchmarks for the GA operators.
+#
+#   python benchmark.py --output results.json
+#   python benchmark.py --output new.json --compare results.json
+#
+# Results are written as JSON so runs from different commits can be diffed or compared.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+from data_processing import build_product_catalog, preprocess_data, sheet_frames
+from data_snapshot import load_dataset
+from genetic_algorithm import GeneticAlgorithm
+from individual import Individual
+from synthetic_data import generate_scenario
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORKBOOK = os.path.join(current_dir, '..', 'Data', 'data_bank.xlsx')
+
+# generate_scenario settings of the synthetic datasets, generated at every --sizes (modules x horizon)
+SYNTHETIC_DATASETS = {
+    'synthetic-loose': {'blocked_fraction': 0.05, 'max_predecessors': 2, 'seed': 1},
+    'synthetic-tight': {'blocked_fraction': 0.15, 'max_predecessors': 4, 'seed': 3},
+}
+
+def parse_size(value):
+    # "300x400" -> (300 modules, 400 periods)
+    modules, _, periods = value.partition('x')
+    return int(modules), int(periods)
+
+def synthetic_dataset(name, num_modules, num_periods):
+    # a generated portfolio, preprocessed the same way as a workbook but without writing one
+    sheets = generate_scenario(num_modules, num_periods, **SYNTHETIC_DATASETS[name])
+    module_profile, dependencies, feasible_set, feasibility_index = preprocess_data(*sheet_frames(sheets))
+    return {
+        'module_profile': module_profile,
+        'dependencies': dependencies,
+        'feasible_set': feasible_set,
+        'feasibility_index': feasibility_index,
+        'catalog': build_product_catalog(sheets['product_catalog'])
+    }
+
+def benchmark_datasets(names, sizes, workbook_path):
+    # (name, size label, dataset); the workbook has its own size, the synthetic datasets are generated at every size
+    for name in names:
+        if name == 'workbook':
+            dataset = load_dataset(workbook_path)
+            yield name, f"{len(dataset['module_profile'])}x{max(len(periods) for periods in dataset['feasible_set'].values())}", dataset
+        elif name in SYNTHETIC_DATASETS:
+            for size in sizes:
+                yield name, size, synthetic_dataset(name, *parse_size(size))
+        else:
+            raise ValueError(f"Unknown dataset '{name}'")
+
+def make_ga(dataset, interaction=20, information=0):
+    modules = sorted(dataset['module_profile'].keys())
+    interaction_degree = pd.DataFrame(interaction, index=modules, columns=modules)
+    information_flow = pd.DataFrame(information, index=modules, columns=modules)
+    module_profile = {module: dict(profile, duration=list(profile['duration'])) for module, profile in dataset['module_profile'].items()}
+    ga = GeneticAlgorithm(module_profile, dataset['dependencies'], dataset['feasible_set'], interaction_degree, information_flow,
+                          feasibility_index=dataset['feasibility_index'], catalog=dataset.get('catalog'))
+    ga.update_module_duration()
+    return ga
+
+def time_call(fn, repeat, setup=None):
+    # setup, when given, runs untimed before every repeat and its return value is passed to fn
+    timings = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return {'min': min(timings), 'median': statistics.median(timings), 'mean': statistics.mean(timings), 'repeat': repeat}
+
+def bench_operators(ga, pop_size, repeat):
+    ga.rng.seed(0)
+    population = ga.initialize_population(pop_size)
+    fitness_scores = ga.evaluate_population(population)[0].tolist()
+    pairs = [(ga.rng.choice(population), ga.rng.choice(population)) for _ in range(pop_size)]
+
+    # evaluated individuals keep their values, so every repeat evaluates new ones: copies carrying no values
+    # (a full evaluation of every individual), or mutants of evaluated ones (only their changed modules and products)
+    def unevaluated():
+        ga.fitness_cache.clear()
+        return [Individual(individual) for individual in population]
+
+    def mutants():
+        ga.fitness_cache.clear()
+        return ga.mutation([individual.copy() for individual in population], 1.0)
+
+    return {
+        'generate_individual': time_call(ga.generate_individual, repeat),
+        'initialize_population': time_call(lambda: ga.initialize_population(pop_size), repeat),
+        'fitness_function': time_call(lambda: [ga.fitness_function(individual) for individual in population], repeat),
+        'evaluate_population': time_call(ga.evaluate_population, repeat, unevaluated),
+        'evaluate_incremental': time_call(ga.evaluate_population, repeat, mutants),
+        'uniform_crossover': time_call(lambda: [ga.uniform_crossover(p1, p2) for p1, p2 in pairs], repeat),
+        'crossover': time_call(lambda: ga.crossover(population, fitness_scores, 1.0), repeat),
+        'mutation': time_call(lambda: ga.mutation([dict(individual) for individual in population], 1.0), repeat),
+    }
+
+def bench_run(ga, pop_size, generations, repeat):
+    def run():
+        ga.rng.seed(0)
+        ga.fitness_cache.clear()
+        ga.run(pop_size, 0.8, 0.2, generations)
+    return time_call(run, repeat)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=current_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline):
+    # ratio of median times, new / baseline, for every benchmark present in both files
+    def key(entry):
+        return (entry['benchmark'], entry['dataset'], entry.get('size'), entry['population'], entry.get('generations'))
+    baseline_by_key = {key(entry): entry for entry in baseline['results']}
+    rows = []
+    for entry in results['results']:
+        base = baseline_by_key.get(key(entry))
+        if base is None:
+            continue
+        ratio = entry['seconds']['median'] / base['seconds']['median'] if base['seconds']['median'] else float('inf')
+        rows.append((key(entry), base['seconds']['median'], entry['seconds']['median'], ratio))
+    return rows
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the genetic algorithm operators')
+    parser.add_argument('--datasets', default='workbook,synthetic-loose,synthetic-tight')
+    parser.add_argument('--sizes', default='12x156,100x156,300x400', help='modules x horizon of the synthetic datasets')
+    parser.add_argument('--populations', default='50,200,1000')
+    parser.add_argument('--generations', default='5,20')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    parser.add_argument('--skip-run', action='store_true', help='only run the operator micro-benchmarks')
+    args = parser.parse_args(argv)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': []
+    }
+
+    for dataset_name, size, dataset in benchmark_datasets(parse_list(args.datasets, str), parse_list(args.sizes, str), args.workbook):
+        ga = make_ga(dataset)
+        label = f"{dataset_name} {size}"
+        for pop_size in parse_list(args.populations, int):
+            for benchmark, seconds in bench_operators(ga, pop_size, args.repeat).items():
+                results['results'].append({'benchmark': benchmark, 'dataset': dataset_name, 'size': size, 'population': pop_size, 'generations': None, 'seconds': seconds})
+                print(f"{label:24} pop={pop_size:<6} {benchmark:22} median {seconds['median']:.6f}s")
+
+            if args.skip_run:
+                continue
+            for generations in parse_list(args.generations, int):
+                seconds = bench_run(ga, pop_size, generations, args.repeat)
+                results['results'].append({'benchmark': 'run', 'dataset': dataset_name, 'size': size, 'population': pop_size, 'generations': generations, 'seconds': seconds})
+                print(f"{label:24} pop={pop_size:<6} {'run x' + str(generations):22} median {seconds['median']:.6f}s")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('commit')}):")
+        for (benchmark, dataset_name, size, pop_size, generations), base, new, ratio in compare(results, baseline):
+            label = benchmark if generations is None else f"{benchmark} x{generations}"
+            print(f"{dataset_name + ' ' + str(size):24} pop={pop_size:<6} {label:22} {base:.6f}s -> {new:.6f}s ({ratio:.2f}x)")
+
+if __name__ == "__main__":
+    main()
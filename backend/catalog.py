@@ -0,0 +1,84 @@
+import numpy as np
+
+# built-in product definitions and ILT, used when the data has no product_catalog sheet
+PRODUCTS = {
+    'P11': {'name': 'P11', 'ILT': 53, 'product_rev':2000000, 1: 1, 2: 0, 3: 0, 4: 1, 5: 0, 6: 1, 7: 1, 8: 0, 9: 0, 10: 0, 11: 0, 12: 1},
+    'P21': {'name': 'P21', 'ILT': 53, 'product_rev':2000000, 1: 1, 2: 0, 3: 0, 4: 0, 5: 1, 6: 1, 7: 1, 8: 0, 9: 0, 10: 1, 11: 0, 12: 0},
+    'P31': {'name': 'P31', 'ILT': 53, 'product_rev':2000000, 1: 1, 2: 0, 3: 0, 4: 1, 5: 0, 6: 1, 7: 1, 8: 0, 9: 0, 10: 0, 11: 1, 12: 0},
+    'P12': {'name': 'P12', 'ILT': 53, 'product_rev':3000000, 1: 0, 2: 1, 3: 0, 4: 1, 5: 0, 6: 1, 7: 0, 8: 1, 9: 0, 10: 1, 11: 0, 12: 0},
+    'P22': {'name': 'P22', 'ILT': 53, 'product_rev':3000000, 1: 0, 2: 1, 3: 0, 4: 0, 5: 1, 6: 1, 7: 0, 8: 1, 9: 0, 10: 0, 11: 1, 12: 0},
+    'P32': {'name': 'P32', 'ILT': 53, 'product_rev':3000000, 1: 0, 2: 1, 3: 0, 4: 0, 5: 1, 6: 1, 7: 0, 8: 1, 9: 0, 10: 0, 11: 0, 12: 1},
+    'P13': {'name': 'P13', 'ILT': 53, 'product_rev':4000000, 1: 0, 2: 0, 3: 1, 4: 1, 5: 0, 6: 1, 7: 0, 8: 0, 9: 1, 10: 0, 11: 1, 12: 0},
+    'P23': {'name': 'P23', 'ILT': 53, 'product_rev':4000000, 1: 0, 2: 0, 3: 1, 4: 0, 5: 1, 6: 1, 7: 0, 8: 0, 9: 1, 10: 1, 11: 0, 12: 0}
+}
+
+FAMILIES = {
+    'K1': ['P11', 'P21', 'P31'],
+    'K2': ['P12', 'P22', 'P32'],
+    'K3': ['P13', 'P23'],
+}
+
+INTEREST_RATE = 0.002
+
+class CatalogError(ValueError):
+    # raised for a product catalog sheet that cannot be compiled
+    pass
+
+class ProductCatalog:
+    # the products (ILT, revenue and the modules each one uses), their families and the per-period interest rate,
+    # compiled once per dataset; the GA evaluates against its incidence matrix and discount/revenue tables
+    def __init__(self, names, families, ilt, revenue, product_modules, interest_rate=INTEREST_RATE):
+        self.names = list(names)
+        self.position = {name: p for p, name in enumerate(self.names)}
+        for family, products in families.items():
+            unknown = [name for name in products if name not in self.position]
+            if unknown:
+                raise CatalogError(f"Family {family} lists unknown products {unknown}")
+        if not self.names or not families:
+            raise CatalogError("The product catalog needs at least one product and one family")
+        if interest_rate <= 0:
+            raise CatalogError(f"The interest rate must be positive, got {interest_rate}")
+
+        self.family_names = list(families)
+        self.family_products = [np.array([self.position[name] for name in products], dtype=np.int64) for products in families.values()]
+        self.ilt = np.asarray(ilt, dtype=float)
+        self.revenue = np.asarray(revenue, dtype=float)
+        self.product_modules = [sorted(modules) for modules in product_modules]
+        self.interest_rate = float(interest_rate)
+        self.growth = 1 + self.interest_rate
+        self._tables = {}
+
+    @classmethod
+    def from_products(cls, products, families, interest_rate=INTEREST_RATE):
+        # from the PRODUCTS layout: {name: {'name', 'ILT', 'product_rev', module: 0/1, ...}}
+        names = list(products)
+        return cls(names, families,
+                   [products[name]['ILT'] for name in names],
+                   [products[name]['product_rev'] for name in names],
+                   [[module for module, used in products[name].items() if not isinstance(module, str) and used == 1] for name in names],
+                   interest_rate)
+
+    def incidence(self, modules):
+        # (n_products x n_modules) bool, whether product p uses module modules[j]
+        position = {module: j for j, module in enumerate(modules)}
+        incidence = np.zeros((len(self.names), len(modules)), dtype=bool)
+        for p, product_modules in enumerate(self.product_modules):
+            incidence[p, [position[module] for module in product_modules if module in position]] = True
+        return incidence
+
+    def discount_table(self, size):
+        # growth ** k for k = 0..size-1, the compounding factor over k periods
+        key = ('discount', size)
+        if key not in self._tables:
+            self._tables[key] = self.growth ** np.arange(size, dtype=float)
+        return self._tables[key]
+
+    def revenue_table(self, horizon, size):
+        # (n_products x size) present value of each product's revenue annuity when it launches in period 0..size-1
+        key = ('revenue', horizon, size)
+        if key not in self._tables:
+            launch = np.arange(size, dtype=float)
+            self._tables[key] = self.revenue[:, None] * (1 - self.growth ** -(horizon - launch)) * self.growth / self.interest_rate
+        return self._tables[key]
+
+DEFAULT_CATALOG = ProductCatalog.from_products(PRODUCTS, FAMILIES)
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+import numpy as np
+from data_snapshot import atomic_write
+from genetic_algorithm import ParameterError
+
+# bump whenever the checkpoint layout changes, older checkpoints are then refused
+CHECKPOINT_FORMAT = 1
+
+# checkpoint names become file names, so only allow a conservative set of characters
+CHECKPOINT_NAME = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.-]{0,99}')
+
+def checkpoint_path(directory, name):
+    if not isinstance(name, str) or not CHECKPOINT_NAME.fullmatch(name):
+        raise ParameterError(f"Invalid checkpoint name {name!r}, use up to 100 letters, digits, '_', '-' or '.'")
+    return os.path.join(directory, name + '.npz')
+
+class Checkpointer:
+    # writes a run's population, best individual and RNG state to one compressed .npz file
+    # fingerprint identifies the inputs of the run, a checkpoint is only resumed with the same fingerprint
+    def __init__(self, path, interval=10, fingerprint=None):
+        self.path = path
+        self.interval = max(1, interval)
+        self.fingerprint = fingerprint
+
+    def save(self, ga, generation, population, best_individual, best_fitness, best_product_selection):
+        starts, suppliers, crashes = ga.population_to_arrays(population)
+        version, rng_state, gauss_next = ga.rng.getstate()
+        meta = {
+            'format': CHECKPOINT_FORMAT,
+            'fingerprint': self.fingerprint,
+            'generation': generation,
+            'modules': [int(module) for module in ga.module_arrays()['modules']],
+            'best_individual': None if best_individual is None else {str(module): gene for module, gene in best_individual.items()},
+            'best_fitness': best_fitness,
+            'best_product_selection': best_product_selection,
+            'rng_version': version,
+            'rng_gauss_next': gauss_next
+        }
+
+        # written atomically so a crash mid-write never leaves a truncated checkpoint
+        atomic_write(self.path, lambda f: np.savez_compressed(
+            f, starts=starts.astype(np.int32), suppliers=suppliers.astype(np.int8), crashes=crashes.astype(np.int16),
+            rng_state=np.array(rng_state, dtype=np.int64), meta=np.array(json.dumps(meta))))
+
+def load_checkpoint(path):
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        if meta['format'] != CHECKPOINT_FORMAT:
+            raise ValueError(f"Checkpoint {os.path.basename(path)} has format {meta['format']}, expected {CHECKPOINT_FORMAT}")
+        checkpoint = {
+            'starts': data['starts'].astype(np.int64),
+            'suppliers': data['suppliers'].astype(np.int64),
+            'crashes': data['crashes'].astype(np.int64),
+            'rng_state': (meta['rng_version'], tuple(int(value) for value in data['rng_state']), meta['rng_gauss_next'])
+        }
+    # JSON object keys are strings, restore the module numbers
+    best_individual = meta['best_individual']
+    checkpoint.update({
+        'fingerprint': meta['fingerprint'],
+        'generation': meta['generation'],
+        'modules': meta['modules'],
+        'best_individual': None if best_individual is None else {int(module): gene for module, gene in best_individual.items()},
+        'best_fitness': meta['best_fitness'],
+        'best_product_selection': meta['best_product_selection']
+    })
+    return checkpoint
+
+def checkpoint_population(ga, checkpoint):
+    # the checkpointed best individual followed by the population as dicts, for warm-starting a run whose inputs
+    # may differ; modules missing from the checkpoint are left out and get placed from scratch by the repair
+    modules = checkpoint['modules']
+    population = []
+    if checkpoint['best_individual'] is not None:
+        population.append({module: gene for module, gene in checkpoint['best_individual'].items() if module in ga.module_profile})
+    for starts, suppliers, crashes in zip(checkpoint['starts'], checkpoint['suppliers'], checkpoint['crashes']):
+        population.append({
+            module: [int(starts[j]), int(suppliers[j]) or None, int(crashes[j]), None]
+            for j, module in enumerate(modules) if module in ga.module_profile
+        })
+    return population
@@ -1,108 +1,163 @@
 #imports
+import os
 import pandas as pd
 import numpy as np
+from catalog import INTEREST_RATE, CatalogError, ProductCatalog
 
-def load_data(file_path):
-    # read the necessary data from csv
-    cost_profile_inh = pd.read_excel(file_path, sheet_name='cost_profile_inhouse')
-    resource_util_inh = pd.read_excel(file_path, sheet_name='resource_util_inhouse')
-    resource_avail_inh = pd.read_excel(file_path, sheet_name='resource_avail_inhouse')
-    crash_data_inh = pd.read_excel(file_path, sheet_name='crash_data_inhouse')
-    crash_data_out = pd.read_excel(file_path, sheet_name='crash_data_outsourced')
-    preced = pd.read_excel(file_path, sheet_name='precedence_constraints', index_col=0)
+# horizon used when there are no in-house resource sheets to derive it from
+DEFAULT_NUM_PERIODS = 156
+
+# sheets of the data bank, the product catalog is optional
+SHEETS = ('cost_profile_inhouse', 'resource_util_inhouse', 'resource_avail_inhouse',
+          'crash_data_inhouse', 'crash_data_outsourced', 'precedence_constraints')
+OPTIONAL_SHEETS = ('product_catalog',)
+
+def load_sheets(path):
+    # all sheets as DataFrames keyed by sheet name, from a workbook opened once or from a directory
+    # holding one <sheet>.parquet or <sheet>.csv file per sheet (for datasets too large to go through Excel)
+    if os.path.isdir(path):
+        sheets = {}
+        for name in SHEETS + OPTIONAL_SHEETS:
+            parquet_path = os.path.join(path, name + '.parquet')
+            csv_path = os.path.join(path, name + '.csv')
+            if os.path.exists(parquet_path):
+                # needs the optional pyarrow (see requirements.txt), pandas raises an ImportError naming it when missing
+                sheets[name] = pd.read_parquet(parquet_path)
+            elif os.path.exists(csv_path):
+                # round-trip parsing so values match what the workbook holds to the last bit
+                sheets[name] = pd.read_csv(csv_path, float_precision='round_trip')
+            elif name in SHEETS:
+                raise FileNotFoundError(f"{path} has no {name}.parquet or {name}.csv")
+    else:
+        with pd.ExcelFile(path) as workbook:
+            names = list(SHEETS) + [name for name in OPTIONAL_SHEETS if name in workbook.sheet_names]
+            sheets = pd.read_excel(workbook, sheet_name=names)
+
+    # the precedence matrix is labelled by its first column, unless it was stored with its index (a Parquet file
+    # written with index=True reads back already labelled)
+    preced = sheets['precedence_constraints']
+    if isinstance(preced.index, pd.RangeIndex):
+        sheets['precedence_constraints'] = preced.set_index(preced.columns[0])
+    return sheets
+
+def sheet_frames(sheets):
+    # the sheets preprocess_data takes, in its argument order
+    return tuple(sheets[name] for name in SHEETS)
 
-    return cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced
+def load_data(file_path):
+    # read the necessary data from the workbook or sheet directory
+    return sheet_frames(load_sheets(file_path))
 
 def preprocess_data(cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced):
-    # initialize dictionary to hold the modules profiles
-    module_profile = {
-        i: {
-            'type': None,
+    # the modules and their in-house/outsourced split come from the crash data sheets
+    inhouse_modules = sorted(int(module) for module in crash_data_inh['module'].unique())
+    outsourced_modules = sorted(int(module) for module in crash_data_out['module'].unique())
+
+    # the planning horizon is the number of period columns in the resource sheets
+    num_periods = len(resource_avail_inh.columns) - 1 if inhouse_modules else DEFAULT_NUM_PERIODS
+
+    module_profile = {}
+    feasible_set = {}
+
+    # in-house modules: the first crash data row per module, its first cost column and its per-period resources;
+    # a period is feasible when the available resource covers the utilisation
+    crash_inh = crash_data_inh.drop_duplicates('module').set_index('module').loc[inhouse_modules]
+    cost = cost_profile_inh.set_index('module').loc[inhouse_modules].iloc[:, 0].astype(float).tolist()
+    resource_util = resource_util_inh.set_index('module').loc[inhouse_modules].to_numpy(dtype=float)
+    resource_avail = resource_avail_inh.set_index('module').loc[inhouse_modules].to_numpy(dtype=float)
+    feasible = (resource_avail >= resource_util).astype(int).tolist()
+    max_crash = crash_inh['allowable_crash'].astype(float).tolist()
+    crash_cost = crash_inh['cost_per_crash_period'].astype(float).tolist()
+    duration = crash_inh['ideal_duration'].astype(float).tolist()
+
+    for i, module in enumerate(inhouse_modules):
+        module_profile[module] = {
+            'type': 'inhouse',
             'supplier': None,
-            'duration': [],
-            'cost': [],
+            'duration': [duration[i]],
+            'cost': cost[i],
+            'resource util': resource_util[i].tolist(),
+            'resource avail': resource_avail[i].tolist(),
+            'max crash': [max_crash[i]],
+            'crash cost': [crash_cost[i]]
+        }
+        feasible_set[module] = feasible[i]
+
+    # outsourced modules: one entry per supplier in order of first appearance, a repeated supplier row overrides the earlier one
+    columns = ['cost', 'lead_time', 'allowable_expediting_time', 'cost_per_crash_period']
+    crash_out = crash_data_out.astype({'module': int, 'supplier': int})
+    order = crash_out.drop_duplicates(['module', 'supplier'])[['module', 'supplier']]
+    values = crash_out.drop_duplicates(['module', 'supplier'], keep='last').set_index(['module', 'supplier'])[columns].astype(float)
+    suppliers = values.loc[pd.MultiIndex.from_frame(order)].reset_index().groupby('module', sort=False).agg(list)
+
+    for module in outsourced_modules:
+        row = suppliers.loc[module]
+        module_profile[module] = {
+            'type': 'outsourced',
+            'supplier': row['supplier'],
+            'duration': row['lead_time'],
+            'cost': row['cost'],
             'resource util': None,
             'resource avail': None,
-            'max crash': [],
-            'crash cost': []
-        } for i in range(1, 13)
-    }
-
-    # populate the dictionary for inhouse and outsourced modules
-    for module in module_profile.keys():
-        if module <= 6:  # inhouse modules
-            module_profile[module]['type'] = 'inhouse'
-            data = crash_data_inh[crash_data_inh['module'] == module].iloc[0]
-            module_profile[module]['max crash'].append(data['allowable_crash'])
-            module_profile[module]['crash cost'].append(data['cost_per_crash_period'])
-            module_profile[module]['duration'].append(data['ideal_duration'])
-            module_profile[module]['cost'] = cost_profile_inh.iloc[module-1, 1].tolist()
-            module_profile[module]['resource util'] = resource_util_inh.iloc[module-1, 1:].tolist()
-            module_profile[module]['resource avail'] = resource_avail_inh.iloc[module-1, 1:].tolist()
-        else:  # outsourced modules
-            module_profile[module]['type'] = 'outsourced'
-
-    # populate the outsourced modules profiles
-    outsource_profile = {}
-    for index, row in crash_data_out.iterrows():
-        module = int(row['module'])
-        supplier = int(row['supplier'])
-        exped_cost = row['cost_per_crash_period']
-        actual_cost = row['cost']
-        lead_time = row['lead_time']
-        allowable_expediting_time = row['allowable_expediting_time']
-        
-        if module not in outsource_profile:
-            outsource_profile[module] = [{'supplier': supplier, 'cost': actual_cost, 'lead time': lead_time, 'exped cost': exped_cost, 'max exped': allowable_expediting_time}]
-        else:
-            supplier_exists = False
-            for supplier_info in outsource_profile[module]:
-                if supplier_info['supplier'] == supplier:
-                    supplier_info['exped cost'] = exped_cost
-                    supplier_info['cost'] = actual_cost
-                    supplier_info['lead time'] = lead_time
-                    supplier_info['max exped'] =allowable_expediting_time
-                    supplier_exists = True
-                    break
-            if not supplier_exists:
-                outsource_profile[module].append({'supplier': supplier, 'cost': actual_cost, 'lead time': lead_time, 'exped cost': exped_cost, 'max exped': allowable_expediting_time})
-
-    # merge outsource_profile data back into module_profile
-    for module in outsource_profile:
-        module_profile[module]['supplier'] = [s['supplier'] for s in outsource_profile[module]]
-        module_profile[module]['duration'] = [s['lead time'] for s in outsource_profile[module]]
-        module_profile[module]['cost'] = [s['cost'] for s in outsource_profile[module]]
-        module_profile[module]['max crash'] = [s['max exped'] for s in outsource_profile[module]]
-        module_profile[module]['crash cost'] = [s['exped cost'] for s in outsource_profile[module]]
-
-    # create dictionary to store feasibility periods
-    feasible_set = {}  
-    for module in module_profile:
-        feasible_set[module] = []
-        if module_profile[module]['type'] == 'inhouse':
-            num_periods = len(module_profile[module]['resource avail'])
-            for period in range(num_periods):
-                if module_profile[module]['resource avail'][period] >= module_profile[module]['resource util'][period]:
-                    feasible_set[module].append(1)
-                else:
-                    feasible_set[module].append(0)
-        else:
-            feasible_set[module] = [1]*156
-
-    # convert matrix to list of dependencies
-    dependencies = {i: [] for i in range(1, len(preced.columns) + 1)} 
-    for i, row in preced.iterrows(): 
-        row_index = int(i.strip('M'))  
-        for j, val in enumerate(row):
-            if val == 1:
-                dependencies[j+1].append(row_index)
-    
-    return module_profile, dependencies, feasible_set
+            'max crash': row['allowable_expediting_time'],
+            'crash cost': row['cost_per_crash_period']
+        }
+        feasible_set[module] = [1] * num_periods
+
+    module_profile = dict(sorted(module_profile.items()))
+    feasible_set = dict(sorted(feasible_set.items()))
+
+    # convert matrix to list of dependencies, rows and columns are labelled M<module> and a 1 means row precedes column
+    row_modules = [int(str(label).strip('M')) for label in preced.index]
+    column_modules = [int(str(label).strip('M')) for label in preced.columns]
+    dependencies = {module: [] for module in module_profile}
+    for i, j in zip(*np.nonzero(preced.to_numpy() == 1)):
+        dependencies[column_modules[j]].append(row_modules[i])
+
+    feasibility_index = build_feasibility_index(feasible_set)
+
+    return module_profile, dependencies, feasible_set, feasibility_index
+
+def load_product_catalog(file_path, sheets=None):
+    # the product catalog sheet is optional, the built-in catalog is used when it is missing
+    if sheets is None:
+        sheets = load_sheets(file_path)
+    if 'product_catalog' not in sheets:
+        return None
+    return build_product_catalog(sheets['product_catalog'])
+
+def build_product_catalog(catalog):
+    # one row per product: product, family, ILT, revenue and a 0/1 column M<module> per module it uses,
+    # plus an optional interest_rate column holding the per-period rate of the whole catalog
+    module_columns = [column for column in catalog.columns if str(column).startswith('M')]
+    modules = np.array([int(str(column).strip('M')) for column in module_columns])
+    usage = catalog[module_columns].to_numpy(dtype=int) == 1
+    names = catalog['product'].astype(str).tolist()
+    families = {}
+    for name, family in zip(names, catalog['family'].astype(str)):
+        families.setdefault(family, []).append(name)
+
+    interest_rate = INTEREST_RATE
+    if 'interest_rate' in catalog.columns:
+        rates = catalog['interest_rate'].dropna().astype(float).unique()
+        if len(rates) != 1:
+            raise CatalogError(f"The product catalog needs a single interest_rate, got {rates.tolist()}")
+        interest_rate = rates[0]
+
+    return ProductCatalog(names, families, catalog['ILT'].astype(float), catalog['revenue'].astype(float),
+                          [modules[row].tolist() for row in usage], interest_rate)
+
+def build_feasibility_index(feasible_set):
+    # prefix sums of infeasible periods per module, so a start window can be checked in O(1):
+    # periods start..end are all feasible when index[end] - index[start-1] == 0
+    feasibility_index = {}
+    for module, periods in feasible_set.items():
+        feasibility_index[module] = np.concatenate(([0], np.cumsum(np.asarray(periods) == 0)))
+    return feasibility_index
 
-import os
 if __name__ == "__main__":
     current_dir = os.path.dirname(os.path.abspath(__file__))
     file_path = os.path.join(current_dir, '..', 'Data', 'data_bank.xlsx')
     cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced = load_data(file_path)
-    module_profile, dependencies, feasible_set = preprocess_data(cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced)
+    module_profile, dependencies, feasible_set, feasibility_index = preprocess_data(cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced)
     print(module_profile[1]['cost'])
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import numpy as np
+from data_processing import load_sheets, sheet_frames, preprocess_data, load_product_catalog
+
+# bump whenever the layout of the preprocessed data changes so stale snapshots are rebuilt
+SNAPSHOT_FORMAT = 3
+
+# per-period data kept in memory-mapped (modules x periods) matrices next to the snapshot, see share_dataset
+SHARED_ARRAYS = ('feasible_set', 'feasibility_index', 'resource_util', 'resource_avail')
+
+def snapshot_path(workbook_path):
+    snapshot_dir = os.environ.get('DATA_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(workbook_path)), '.cache'))
+    return os.path.join(snapshot_dir, os.path.basename(workbook_path) + '.snapshot')
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_files(path):
+    # the files a dataset is read from: the workbook itself, or the sheet files of a directory
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(('.csv', '.parquet'))]
+    return [path]
+
+def source_stat(path):
+    # (mtime_ns, size) of the dataset, the newest mtime and the total size for a directory
+    stats = [os.stat(file_path) for file_path in source_files(path)]
+    return max((stat.st_mtime_ns for stat in stats), default=0), sum(stat.st_size for stat in stats)
+
+def source_sha256(path):
+    if not os.path.isdir(path):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for file_path in source_files(path):
+        digest.update(os.path.basename(file_path).encode() + b'\0' + file_sha256(file_path).encode())
+    return digest.hexdigest()
+
+def read_snapshot_header(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+def read_snapshot(path):
+    # the file holds two pickles: a small header followed by the preprocessed data
+    with open(path, 'rb') as f:
+        header = pickle.load(f)
+        return header, pickle.load(f)
+
+def atomic_write(path, write, mode='wb'):
+    # write(f) goes to a temporary file next to path that is then renamed over it, so concurrent readers never see
+    # a partial file and a crash mid-write leaves the previous one in place
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def write_snapshot(path, header, data):
+    def write(f):
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    atomic_write(path, write)
+
+def build_dataset(workbook_path):
+    # every sheet is read in one pass and shared by the preprocessing and the product catalog
+    sheets = load_sheets(workbook_path)
+    module_profile, dependencies, feasible_set, feasibility_index = preprocess_data(*sheet_frames(sheets))
+    return {
+        'module_profile': module_profile,
+        'dependencies': dependencies,
+        'feasible_set': feasible_set,
+        'feasibility_index': feasibility_index,
+        'catalog': load_product_catalog(workbook_path, sheets)
+    }
+
+def load_dataset(workbook_path):
+    # load the preprocessed workbook (or sheet directory) from its compiled snapshot, rebuilding it when the data changed
+    mtime_ns, size = source_stat(workbook_path)
+    path = snapshot_path(workbook_path)
+    header = read_snapshot_header(path)
+
+    if header is not None and header.get('format') == SNAPSHOT_FORMAT:
+        if header['mtime_ns'] == mtime_ns and header['size'] == size:
+            header, dataset = read_snapshot(path)
+            return dict(dataset, version=header['sha256'])
+
+        # the workbook was touched, only rebuild when its content actually changed
+        sha256 = source_sha256(workbook_path)
+        if header['sha256'] == sha256:
+            _, dataset = read_snapshot(path)
+            header = dict(header, mtime_ns=mtime_ns, size=size)
+            try:
+                write_snapshot(path, header, dataset)
+            except OSError:
+                pass
+            return dict(dataset, version=sha256)
+    else:
+        sha256 = source_sha256(workbook_path)
+
+    dataset = build_dataset(workbook_path)
+    header = {'format': SNAPSHOT_FORMAT, 'mtime_ns': mtime_ns, 'size': size, 'sha256': sha256}
+    try:
+        write_snapshot(path, header, dataset)
+    except OSError as e:
+        # a read-only data directory only costs us the snapshot, not the dataset
+        print(f"Could not write data snapshot {path}: {e}")
+    return dict(dataset, version=sha256)
+
+def stack_arrays(dataset):
+    # the per-period data as matrices in sorted module order, resources only for the in-house modules;
+    # raises ValueError when the modules do not share one horizon
+    modules = sorted(dataset['feasible_set'])
+    profile = dataset['module_profile']
+    inhouse = [module for module in modules if profile[module]['resource util'] is not None]
+    horizon = len(dataset['feasible_set'][modules[0]]) if modules else 0
+    return {
+        'feasible_set': np.array([dataset['feasible_set'][module] for module in modules], dtype=np.int8),
+        'feasibility_index': np.array([dataset['feasibility_index'][module] for module in modules], dtype=np.int64),
+        'resource_util': np.array([profile[module]['resource util'] for module in inhouse], dtype=float).reshape(len(inhouse), -1 if inhouse else horizon),
+        'resource_avail': np.array([profile[module]['resource avail'] for module in inhouse], dtype=float).reshape(len(inhouse), -1 if inhouse else horizon)
+    }
+
+def strip_arrays(dataset):
+    # the rest of the dataset, with the per-period data left out, plus the row order of the matrices
+    modules = sorted(dataset['feasible_set'])
+    profile = dataset['module_profile']
+    inhouse = [module for module in modules if profile[module]['resource util'] is not None]
+    module_profile = {module: dict(profile[module], **{'resource util': None, 'resource avail': None}) for module in modules}
+    return dict(dataset, module_profile=module_profile, feasible_set=None, feasibility_index=None), modules, inhouse
+
+def shared_paths(workbook_path, version):
+    # the stripped dataset and its matrices for one version of the data
+    directory = snapshot_path(workbook_path) + '.arrays'
+    prefix = os.path.join(directory, f'{version[:16]}-{SNAPSHOT_FORMAT}-')
+    return directory, prefix + 'dataset.pickle', {name: prefix + name + '.npy' for name in SHARED_ARRAYS}
+
+def write_shared(workbook_path, dataset):
+    directory, pickle_path, array_paths = shared_paths(workbook_path, dataset['version'])
+    os.makedirs(directory, exist_ok=True)
+    files = [(path, lambda f, array=array: np.save(f, array)) for path, array in zip(array_paths.values(), stack_arrays(dataset).values())]
+    # the pickle goes last, its presence marks the arrays as complete
+    files.append((pickle_path, lambda f: pickle.dump(strip_arrays(dataset), f, protocol=pickle.HIGHEST_PROTOCOL)))
+    for path, write in files:
+        atomic_write(path, write)
+
+    # files of earlier versions of the data are no longer needed
+    prefix = os.path.basename(pickle_path)[:-len('dataset.pickle')]
+    for name in os.listdir(directory):
+        if not name.startswith(prefix) and not name.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+def attach_shared(workbook_path, version):
+    # the stripped dataset with row views of its read-only memory-mapped matrices filled back in
+    _, pickle_path, array_paths = shared_paths(workbook_path, version)
+    with open(pickle_path, 'rb') as f:
+        dataset, modules, inhouse = pickle.load(f)
+    arrays = {name: np.load(path, mmap_mode='r') for name, path in array_paths.items()}
+
+    module_profile = dataset['module_profile']
+    for row, module in enumerate(inhouse):
+        module_profile[module].update({'resource util': arrays['resource_util'][row], 'resource avail': arrays['resource_avail'][row]})
+    dataset['feasible_set'] = {module: arrays['feasible_set'][i] for i, module in enumerate(modules)}
+    dataset['feasibility_index'] = {module: arrays['feasibility_index'][i] for i, module in enumerate(modules)}
+    return dict(dataset, version=version)
+
+def load_shared_dataset(workbook_path):
+    # like load_dataset, but the per-period data comes as memory-mapped matrices that every worker process serving
+    # the same data maps from the page cache instead of holding its own copy; when the snapshot is current this
+    # never unpickles the per-period lists at all
+    mtime_ns, size = source_stat(workbook_path)
+    header = read_snapshot_header(snapshot_path(workbook_path))
+    if header is not None and header.get('format') == SNAPSHOT_FORMAT and header['mtime_ns'] == mtime_ns and header['size'] == size:
+        try:
+            return attach_shared(workbook_path, header['sha256'])
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+    dataset = load_dataset(workbook_path)
+    try:
+        write_shared(workbook_path, dataset)
+        return attach_shared(workbook_path, dataset['version'])
+    except (OSError, ValueError) as e:
+        # the dataset still works unshared, each process just holds its own copy
+        print(f"Could not share the data arrays of {workbook_path}: {e}")
+        return dataset
+
+if __name__ == "__main__":
+    import sys
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    workbook_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '..', 'Data', 'data_bank.xlsx')
+    dataset = load_dataset(workbook_path)
+    print(f"Snapshot {snapshot_path(workbook_path)} is up to date (version {dataset['version'][:12]})")
@@ -1,98 +1,213 @@
+import bisect
 import math 
 import random
+import uuid
 import numpy as np
-import pandas as pd
 from collections import deque
+from fitness_cache import FitnessCache
+from individual import Individual
+from catalog import DEFAULT_CATALOG
+from data_processing import build_feasibility_index
+from instrumentation import NULL_METRICS
+from matrices import compile_matrix
+
+class RunCancelled(Exception):
+    # raised from inside a run when its cancel event is set
+    pass
+
+class ParameterError(ValueError):
+    # raised for an invalid or conflicting run parameter of a request
+    pass
+
+class InfeasibleScheduleError(ValueError):
+    # raised up front when no schedule can satisfy the dependencies, the horizon and the resource availability
+    pass
 
 class GeneticAlgorithm:
-    def __init__(self, module_profile, dependencies, feasible_set, interaction_degree, information_flow):
+    def __init__(self, module_profile, dependencies, feasible_set, interaction_degree, information_flow, fitness_cache_size=10000, feasibility_index=None, catalog=None, rng=None):
         self.module_profile = module_profile
         self.dependencies = dependencies
         self.feasible_set = feasible_set
-        self.interaction_degree = interaction_degree
-        self.information_flow = information_flow
-
-    def generate_individual(self):
-        while True:  # keep trying until a valid individual is generated
-            individual = {}
-            periods = {module: [] for module in self.module_profile.keys()}
-            module_sequence = self.topological_sort(self.dependencies)
-            valid_schedule = True
-
-            for module in module_sequence:
-                # handle in-house modules with non-preemptive scheduling
-                if self.module_profile[module]['type'] == 'inhouse':
-                    duration = self.module_profile[module]['duration'][0]
-                    max_crash = int(self.module_profile[module]['max crash'][0])
-                    crash_period = random.randint(0, max_crash) if max_crash > 0 else 0
-                    duration -= crash_period
-                    is_allocated = False
-                    available_periods = list(range(1, int(156 - duration + 1)))
-                    random.shuffle(available_periods)  # randomize the order of period selection
-
-                    for start_period in available_periods:
-                        if self.check_precedence(start_period, module, periods):
-                            if self.check_resource_availability(start_period, duration, module):
-                                is_allocated = True
-                                periods[module] = [start_period, None, crash_period, int(start_period + duration)]
-                                break
-                    if not is_allocated:
-                        valid_schedule = False
-                        break
-
-                # handle outsourced modules
-                if self.module_profile[module]['type'] == 'outsourced':
-                    supplier = random.choice(self.module_profile[module]['supplier'])
-                    duration = self.module_profile[module]['duration'][supplier - 1]
-                    max_crash = int(self.module_profile[module]['max crash'][supplier - 1])
-                    crash_period = random.randint(0, max_crash) if max_crash > 0 else 0
-                    duration -= crash_period
-                    is_allocated = False
-                    available_periods = list(range(1, int(156 - duration + 1)))
-                    random.shuffle(available_periods)  # randomize the order of period selection
-
-                    for start_period in available_periods:
-                        if self.check_precedence(start_period, module, periods):
-                            periods[module] = [start_period, supplier, crash_period, int(start_period + duration)]
-                            is_allocated = True
-                            break
-
-                    if not is_allocated:
-                        valid_schedule = False
-                        break 
-
-            if valid_schedule:
-                individual = periods
-                return individual 
-    
+        # planning horizon and product catalog come from the data, the built-in catalog is the fallback
+        self.horizon = max(len(periods) for periods in feasible_set.values())
+        self.catalog = catalog if catalog is not None else DEFAULT_CATALOG
+        # every random draw of the run comes from its own generator, so concurrent runs never share a random state
+        # and a run seeded the same way repeats exactly
+        self.rng = rng if rng is not None else random.Random()
+        self.modules = sorted(module_profile.keys())
+        self.feasibility_index = feasibility_index if feasibility_index is not None else build_feasibility_index(feasible_set)
+        self._valid_starts = {}
+        self._module_arrays = None
+        self._schedule_windows = None
+        self.successors = self.build_successors(dependencies)
+        self.module_order = self.topological_sort(dependencies)
+        self.fitness_cache = FitnessCache(fitness_cache_size)
+        # replaced by a RunMetrics to record phase timings and operator outcomes
+        self.metrics = NULL_METRICS
+        # memetic refinement: hill-climb the local_search_top_k best individuals of every generation for up to
+        # local_search_steps improving moves, and the final best for up to final_search_steps, off when 0
+        self.local_search_top_k = 0
+        self.local_search_steps = 10
+        self.final_search_steps = 100
+        self.set_matrices(interaction_degree, information_flow)
+
+    def set_matrices(self, interaction_degree, information_flow):
+        # both matrices are compiled to float arrays over self.modules, [i, j] being the percentage module i takes from module j;
+        # the precedence checks only read the per-module list of (predecessor, interaction degree / 100) with a positive degree
+        self.interaction_degree = None if interaction_degree is None else compile_matrix(interaction_degree, self.modules, 'interactionMatrix')
+        self.information_flow = None if information_flow is None else compile_matrix(information_flow, self.modules, 'informationMatrix')
+        self.predecessor_degrees = {module: [] for module in self.modules}
+        if self.interaction_degree is not None:
+            position = {module: i for i, module in enumerate(self.modules)}
+            for module, predecessors in self.dependencies.items():
+                for predecessor in predecessors:
+                    degree = self.interaction_degree[position[module], position[predecessor]]
+                    if degree > 0:
+                        self.predecessor_degrees[module].append((predecessor, float(degree) / 100))
+        self._schedule_windows = None
+
+    def generate_individual(self, template=None):
+        # place modules in topological order, each inside the window left by its placed predecessors and
+        # bounded by the latest start that still leaves room for all of its successors, so every attempt succeeds
+        # with a template individual its genes are kept wherever they still fit, and moved to the nearest valid start otherwise
+        windows = self.schedule_windows()
+        individual = Individual()
+        effective_durations = {}
+
+        for module in self.module_order:
+            window = windows[module]
+            earliest = 1
+            for predecessor, degree in window['predecessors']:
+                earliest = max(earliest, int(individual[predecessor][0] + degree * effective_durations[predecessor]))
+
+            # options (supplier, crash) that still have a valid start between earliest and their latest start
+            feasible = []
+            for option in window['options']:
+                supplier, crash_period, duration, starts, latest = option
+                if latest is not None:
+                    first = bisect.bisect_left(starts, earliest)
+                    if first <= latest:
+                        feasible.append((option, first))
+
+            gene = None if template is None else template.get(module)
+            kept = None if gene is None else next(((option, first) for option, first in feasible if option[0] == gene[1] and option[1] == gene[2]), None)
+            if kept is not None:
+                # keep the template's supplier and crash, clamping its start into the window
+                option, first = kept
+                _, crash_period, duration, starts, latest = option
+                start_period = starts[min(max(bisect.bisect_left(starts, gene[0]), first), latest)]
+            else:
+                # pick the supplier first and then its crash, like the mutation operator does
+                supplier = self.rng.choice(list(dict.fromkeys(option[0] for option, _ in feasible)))
+                option, first = self.rng.choice([(option, first) for option, first in feasible if option[0] == supplier])
+                _, crash_period, duration, starts, latest = option
+                start_period = starts[self.rng.randint(first, latest)]
+
+            individual[module] = [start_period, option[0], crash_period, int(start_period + duration)]
+            effective_durations[module] = duration
+
+        if template is None:
+            self.metrics.count('generated_individuals')
+        elif any(individual[module][:3] != template.get(module, [None])[:3] for module in individual):
+            self.metrics.count('repaired_individuals')
+        return individual
+
+    def schedule_windows(self):
+        # per module: its predecessors with a positive interaction degree, and for every (supplier, crash) option
+        # [supplier, crash, duration, resource-feasible starts, index of the latest start that keeps all successors schedulable]
+        if self._schedule_windows is not None:
+            return self._schedule_windows
+
+        windows = {}
+        for module in self.module_order:
+            profile = self.module_profile[module]
+            options = []
+            suppliers = [None] if profile['type'] == 'inhouse' else profile['supplier']
+            for supplier in suppliers:
+                option_index = 0 if supplier is None else supplier - 1
+                for crash_period in range(int(profile['max crash'][option_index]) + 1):
+                    duration = profile['duration'][option_index] - crash_period
+                    options.append([supplier, crash_period, duration, self.valid_starts(module, duration), None])
+            windows[module] = {'options': options, 'predecessors': self.predecessor_degrees[module], 'latest': None}
+
+        # backward pass: a module may start no later than each successor's latest start minus the overlap it imposes
+        lags = {module: [] for module in windows}
+        for module, window in windows.items():
+            for predecessor, degree in window['predecessors']:
+                lags[predecessor].append((module, degree))
+
+        unplaceable = []
+        for module in reversed(self.module_order):
+            window = windows[module]
+            blocked = [successor for successor, _ in lags[module] if windows[successor]['latest'] is None]
+            if blocked:
+                continue
+            for option in window['options']:
+                bound = self.horizon
+                for successor, degree in lags[module]:
+                    # the small epsilon keeps the bound conservative when degree * duration is a float just below an integer
+                    bound = min(bound, windows[successor]['latest'] - math.floor(degree * option[2] + 1e-9))
+                latest = bisect.bisect_right(option[3], bound) - 1
+                option[4] = latest if latest >= 0 else None
+                if option[4] is not None:
+                    start = option[3][option[4]]
+                    window['latest'] = start if window['latest'] is None else max(window['latest'], start)
+            if window['latest'] is None:
+                unplaceable.append(module)
+
+        if unplaceable:
+            raise InfeasibleScheduleError(
+                f"No feasible schedule: modules {sorted(unplaceable)} cannot be placed within the {self.horizon}-period horizon "
+                f"given their resource availability and the time their successors need")
+
+        self._schedule_windows = windows
+        return windows
+
     def check_resource_availability(self, start_period, duration, module):
         end_period = int(start_period + duration)
-        for period in range(start_period, end_period+1):
-            if self.feasible_set[module][period-1] == 0:
-                return False
-        return True
+        index = self.feasibility_index[module]
+        return index[end_period] - index[start_period-1] == 0
+
+    def valid_starts(self, module, duration):
+        # start periods whose whole window passes the resource check, computed once per module and duration
+        key = (module, duration)
+        if key not in self._valid_starts:
+            index = self.feasibility_index[module]
+            starts = np.arange(1, int(self.horizon - duration + 1))
+            ends = (starts + duration).astype(int)
+            self._valid_starts[key] = starts[index[ends] - index[starts - 1] == 0].tolist()
+        return self._valid_starts[key]
     
 
     def check_precedence(self, start_period, module, periods):
-        # Check if all predecessors have completed before the proposed start period
-        if self.dependencies[module]:
-            for predecessor in self.dependencies[module]:
-                if self.interaction_degree[predecessor][module] > 0:
-                    if self.module_profile[predecessor]['type'] == 'inhouse':
-                        predecessor_end_period = periods[predecessor][0] + self.interaction_degree[predecessor][module]/100*(self.module_profile[predecessor]['duration'][0] - periods[predecessor][2])                
-                        if int(predecessor_end_period) > start_period:
-                            return False
-                    else:
-                        predecessor_end_period = periods[predecessor][0] + self.interaction_degree[predecessor][module]/100*(self.module_profile[predecessor]['duration'][periods[predecessor][1] - 1] - periods[predecessor][2])
-                        if int(predecessor_end_period) > start_period:
-                            return False
+        # Check if all predecessors have progressed far enough (their interaction degree) before the proposed start period
+        for predecessor, degree in self.predecessor_degrees[module]:
+            start, supplier, crash_period = periods[predecessor][:3]
+            # in-house modules have no supplier and a single duration
+            duration = self.module_profile[predecessor]['duration'][0 if supplier is None else supplier - 1]
+            if int(start + degree * (duration - crash_period)) > start_period:
+                return False
         return True
 
-    def topological_sort(self, dependencies):
-        in_degree = {i: 0 for i in range(1, len(dependencies) + 1)}
+    def check_local_precedence(self, module, individual):
+        # after changing one module only its own constraints and those of its direct successors can break
+        if not self.check_precedence(individual[module][0], module, individual):
+            return False
+        for successor in self.successors[module]:
+            if not self.check_precedence(individual[successor][0], successor, individual):
+                return False
+        return True
+
+    def build_successors(self, dependencies):
+        successors = {node: [] for node in dependencies}
         for node, preds in dependencies.items():
             for pred in preds:
-                in_degree[node] += 1
+                successors[pred].append(node)
+        return successors
+
+    def topological_sort(self, dependencies):
+        successors = self.build_successors(dependencies)
+        in_degree = {node: len(preds) for node, preds in dependencies.items()}
 
         queue = deque([node for node, deg in in_degree.items() if deg == 0])
         order = [] 
@@ -100,88 +215,283 @@ class GeneticAlgorithm:
         while queue:
             node = queue.popleft()
             order.append(node)
-            for successor in [succ for succ, preds in dependencies.items() if node in preds]:
+            for successor in successors[node]:
                 in_degree[successor] -= 1
                 if in_degree[successor] == 0:
                     queue.append(successor)
 
-        if len(order) == len(dependencies):
-            return order
-        else:
-            return "Cycle Detected!!!"
+        if len(order) != len(dependencies):
+            cyclic = sorted(node for node, deg in in_degree.items() if deg > 0)
+            raise InfeasibleScheduleError(f"Cyclic dependencies: modules {cyclic} are on or depend on a cycle")
+        return order
             
-    def initialize_population(self, pop_size):
-        return [self.generate_individual() for _ in range(pop_size)]
+    def initialize_population(self, pop_size, seed_population=None):
+        # seed_population (e.g. a previous run's final population) is repaired to fit the current inputs,
+        # then topped up with new individuals or truncated to pop_size
+        with self.metrics.phase('initialization'):
+            population = [self.generate_individual(individual) for individual in (seed_population or [])[:pop_size]]
+            return population + [self.generate_individual() for _ in range(pop_size - len(population))]
 
     def fitness_function(self, individual):
-        
-        # Product definitions and ILT
-        products = {
-            'P11': {'name': 'P11', 'ILT': 53, 'product_rev':2000000, 1: 1, 2: 0, 3: 0, 4: 1, 5: 0, 6: 1, 7: 1, 8: 0, 9: 0, 10: 0, 11: 0, 12: 1},
-            'P21': {'name': 'P21', 'ILT': 53, 'product_rev':2000000, 1: 1, 2: 0, 3: 0, 4: 0, 5: 1, 6: 1, 7: 1, 8: 0, 9: 0, 10: 1, 11: 0, 12: 0},
-            'P31': {'name': 'P31', 'ILT': 53, 'product_rev':2000000, 1: 1, 2: 0, 3: 0, 4: 1, 5: 0, 6: 1, 7: 1, 8: 0, 9: 0, 10: 0, 11: 1, 12: 0},
-            'P12': {'name': 'P12', 'ILT': 53, 'product_rev':3000000, 1: 0, 2: 1, 3: 0, 4: 1, 5: 0, 6: 1, 7: 0, 8: 1, 9: 0, 10: 1, 11: 0, 12: 0},
-            'P22': {'name': 'P22', 'ILT': 53, 'product_rev':3000000, 1: 0, 2: 1, 3: 0, 4: 0, 5: 1, 6: 1, 7: 0, 8: 1, 9: 0, 10: 0, 11: 1, 12: 0},
-            'P32': {'name': 'P32', 'ILT': 53, 'product_rev':3000000, 1: 0, 2: 1, 3: 0, 4: 0, 5: 1, 6: 1, 7: 0, 8: 1, 9: 0, 10: 0, 11: 0, 12: 1},
-            'P13': {'name': 'P13', 'ILT': 53, 'product_rev':4000000, 1: 0, 2: 0, 3: 1, 4: 1, 5: 0, 6: 1, 7: 0, 8: 0, 9: 1, 10: 0, 11: 1, 12: 0},
-            'P23': {'name': 'P23', 'ILT': 53, 'product_rev':4000000, 1: 0, 2: 0, 3: 1, 4: 0, 5: 1, 6: 1, 7: 0, 8: 0, 9: 1, 10: 1, 11: 0, 12: 0}
+        # fitness and {family: {product: [profit, launch]}} of a single individual
+        total_profit, selected, family_profit, family_launch = self.batch_fitness(*self.population_to_arrays([individual]))
+        return total_profit[0].item(), self.product_selection(selected[0], family_profit[0], family_launch[0])
+
+    def module_arrays(self):
+        # compile the module profile and product catalog into dense arrays (built lazily, reset when durations change)
+        if self._module_arrays is not None:
+            return self._module_arrays
+
+        modules = sorted(self.module_profile.keys())
+        n_options = max(len(self.module_profile[module]['duration']) for module in modules)
+        duration = np.zeros((len(modules), n_options))
+        cost = np.zeros((len(modules), n_options))
+        crash_cost = np.zeros((len(modules), n_options))
+
+        for i, module in enumerate(modules):
+            profile = self.module_profile[module]
+            n = len(profile['duration'])
+            duration[i, :n] = profile['duration']
+            crash_cost[i, :n] = profile['crash cost']
+            cost[i, :n] = profile['cost'] if profile['type'] == 'outsourced' else [profile['cost']]
+
+        catalog = self.catalog
+        incidence = catalog.incidence(modules)
+
+        # module columns of each product, padded with the product's first module so padded entries never complete
+        # after the product does, and products can be gathered in one pass
+        product_size = max(1, incidence.sum(axis=1).max())
+        product_modules = np.zeros((len(catalog.names), product_size), dtype=np.int64)
+        product_mask = np.zeros((len(catalog.names), product_size), dtype=bool)
+        for p in range(len(catalog.names)):
+            columns = np.flatnonzero(incidence[p])
+            product_modules[p, :] = columns[0] if len(columns) else 0
+            product_modules[p, :len(columns)] = columns
+            product_mask[p, :len(columns)] = True
+
+        # with whole-period durations and ILTs every exponent is an integer period count, so the compounding and
+        # the revenue present values are looked up in tables covering every reachable completion period
+        integral = bool(np.all(duration == np.round(duration)) and np.all(catalog.ilt == np.round(catalog.ilt)))
+        table_size = int(max(self.horizon + duration.max(), catalog.ilt.max())) + 2
+
+        self._module_arrays = {
+            # individuals evaluated with these arrays keep their per-product values tagged with this version
+            'version': uuid.uuid4().hex,
+            'modules': modules,
+            'position': {module: j for j, module in enumerate(modules)},
+            'duration': duration,
+            'cost': cost,
+            'crash cost': crash_cost,
+            'products': catalog.names,
+            'families': catalog.family_names,
+            'family products': catalog.family_products,
+            'incidence': incidence,
+            'product modules': product_modules,
+            'product mask': product_mask,
+            'ILT': catalog.ilt,
+            'product_rev': catalog.revenue,
+            'integral': integral,
+            'discount': catalog.discount_table(table_size) if integral else None,
+            'revenue pv': catalog.revenue_table(self.horizon, table_size) if integral else None,
         }
-        
-        families = {
-            'K1': ['P11', 'P21', 'P31'],
-            'K2': ['P12', 'P22', 'P32'],
-            'K3': ['P13', 'P23'],
+        return self._module_arrays
+
+    def population_to_arrays(self, population):
+        # convert dict individuals into (pop_size x n_modules) start, supplier and crash arrays
+        # in-house modules have no supplier and are stored with supplier 0
+        modules = self.module_arrays()['modules']
+        starts = np.array([[individual[module][0] for module in modules] for individual in population], dtype=np.int64)
+        suppliers = np.array([[individual[module][1] or 0 for module in modules] for individual in population], dtype=np.int64)
+        crashes = np.array([[individual[module][2] for module in modules] for individual in population], dtype=np.int64)
+        return starts, suppliers, crashes
+
+    def arrays_to_population(self, starts, suppliers, crashes):
+        arrays = self.module_arrays()
+        modules = arrays['modules']
+        rows = np.arange(len(modules))
+        durations = arrays['duration'][rows, np.maximum(suppliers - 1, 0)] - crashes
+
+        population = []
+        for i in range(len(starts)):
+            individual = Individual()
+            for j, module in enumerate(modules):
+                start_period = int(starts[i, j])
+                supplier = int(suppliers[i, j]) or None
+                individual[module] = [start_period, supplier, int(crashes[i, j]), int(start_period + durations[i, j])]
+            population.append(individual)
+        return population
+
+    def module_values(self, starts, suppliers, crashes):
+        # module completion time and crashed cost, (pop_size x n_modules)
+        arrays = self.module_arrays()
+        rows = np.arange(len(arrays['modules']))
+        option = np.maximum(suppliers - 1, 0)
+        completion = starts + arrays['duration'][rows, option] - crashes
+        module_cost = arrays['cost'][rows, option] + arrays['crash cost'][rows, option] * crashes ** 2
+        return completion, module_cost
+
+    def product_values(self, completion, module_cost, rows, products):
+        # profit and launch period of product products[k] for individual rows[k] of the module_values output
+        arrays = self.module_arrays()
+        growth = self.catalog.growth
+
+        # gather each product's modules, (n_pairs x largest product)
+        product_modules = arrays['product modules'][products]
+        product_mask = arrays['product mask'][products]
+        product_module_completion = completion[rows[:, None], product_modules]
+        product_module_cost = module_cost[rows[:, None], product_modules]
+
+        # product completion is one period after its latest module
+        product_completion = np.where(product_mask, product_module_completion, 0).max(axis=1) + 1
+        ilt = arrays['ILT'][products]
+        launch = np.maximum(product_completion, ilt)
+
+        if arrays['integral'] and launch.max(initial=0) < len(arrays['discount']):
+            # future value of module costs at product completion, then at the ILT, and present value of revenue
+            discount = arrays['discount']
+            compounding = discount[np.maximum(product_completion[:, None] - product_module_completion - 1, 0).astype(np.int64)]
+            product_cost_fv_at_launch = np.where(product_mask, product_module_cost * compounding, 0).sum(axis=1)
+            product_cost_fv = product_cost_fv_at_launch * discount[np.maximum(0, ilt - product_completion).astype(np.int64)]
+            product_rev_pv = arrays['revenue pv'][products, launch.astype(np.int64)]
+            return product_rev_pv - product_cost_fv, launch
+
+        # future value of module costs at product completion
+        compounding = growth ** (product_completion[:, None] - product_module_completion - 1)
+        product_cost_fv_at_launch = np.where(product_mask, product_module_cost * compounding, 0).sum(axis=1)
+
+        # present value of revenue and future value of the cost
+        product_cost_fv = product_cost_fv_at_launch * growth ** np.maximum(0, ilt - product_completion)
+        product_rev_pv = arrays['product_rev'][products] * (1 - growth ** -(self.horizon - launch)) * growth / self.catalog.interest_rate
+        return product_rev_pv - product_cost_fv, launch
+
+    def family_selection(self, product_profit, launch):
+        # pick the most profitable product of each family from (pop_size x n_products) product values
+        # returns total profit (pop_size,), the selected product index per family (pop_size x n_families)
+        # and the selected products' profit and launch period (pop_size x n_families)
+        arrays = self.module_arrays()
+        selected = np.stack([products[np.argmax(product_profit[:, products], axis=1)] for products in arrays['family products']], axis=1)
+        family_profit = np.take_along_axis(product_profit, selected, axis=1)
+        family_launch = np.take_along_axis(launch, selected, axis=1)
+        return family_profit.sum(axis=1), selected, family_profit, family_launch
+
+    def batch_fitness(self, starts, suppliers, crashes):
+        # vectorized equivalent of fitness_function over a whole population, every product of every individual
+        n_products = len(self.module_arrays()['products'])
+        completion, module_cost = self.module_values(starts, suppliers, crashes)
+        rows = np.repeat(np.arange(len(starts)), n_products)
+        products = np.tile(np.arange(n_products), len(starts))
+        product_profit, launch = self.product_values(completion, module_cost, rows, products)
+        return self.family_selection(product_profit.reshape(len(starts), n_products), launch.reshape(len(starts), n_products))
+
+    def product_selection(self, selected, family_profit, family_launch):
+        # build the fitness_function style {family: {product: [profit, launch]}} for one row of batch_fitness output
+        arrays = self.module_arrays()
+        return {
+            family: {arrays['products'][selected[k]]: [family_profit[k].item(), family_launch[k].item()]}
+            for k, family in enumerate(arrays['families'])
         }
-        
-        total_profit = 0
-        family_product_profit = {}
-        for family, products_list in families.items():
-            product_profit_and_times = {prod: self.calculate_product_profit(products[prod], individual) for prod in products_list}
-            product_profit = {prod: cost for prod, (cost, _) in product_profit_and_times.items()}
-            launch_time_by_product = {prod: time for prod, (_, time) in product_profit_and_times.items()}
-
-            selected_product = max(product_profit, key=product_profit.get)
-            family_profit = product_profit[selected_product]
-            family_launch = launch_time_by_product[selected_product]
-            total_profit += family_profit
-            family_product_profit[family] = {selected_product: [family_profit, family_launch]}
-
-        return total_profit, family_product_profit
-
-    def calculate_product_profit(self, product, individual):
-        product_cost_fv_at_launch = 0
-        max_period = 0  # track the latest module completion time for the product
-        interest_rate = 0.002
-
-        # sum the future costs of the modules at product completion
-        for module in product:
-            if product[module] == 1:  # check if the module is required for the product
-                start_period = individual[module][0]
-                duration = self.module_profile[module]['duration'][0] if self.module_profile[module]['type'] == 'inhouse' else self.module_profile[module]['duration'][individual[module][1] - 1]
-                completion_time = start_period + duration - individual[module][2]
-                max_period = max(max_period, completion_time)
-        product_completion_period = max_period + 1
-
-        for module in product:
-            if product[module] == 1:  # check if the module is required for the product
-                start_period = individual[module][0]
-                duration = self.module_profile[module]['duration'][0] if self.module_profile[module]['type'] == 'inhouse' else self.module_profile[module]['duration'][individual[module][1] - 1]
-                completion_time = start_period + duration - individual[module][2]
-                
-                # add base cost for all periods and crashing cost
-                if self.module_profile[module]['type'] == 'inhouse':
-                    module_cal_cost = self.module_profile[module]['cost'] + self.module_profile[module]['crash cost'][0] * (individual[module][2] ** 2)
-                else:
-                    module_cal_cost = self.module_profile[module]['cost'][individual[module][1] - 1] + self.module_profile[module]['crash cost'][individual[module][1] - 1] * (individual[module][2] ** 2)
-                
-                product_cost_fv_at_launch += module_cal_cost * (1+interest_rate)**(product_completion_period - completion_time - 1)
 
-        # calculate present value of revenue and future value of the cost 
-        product_cost_fv = product_cost_fv_at_launch * (1+interest_rate)**(max(0, (product['ILT'] - product_completion_period)))      
-        
-        product_rev_pv = product['product_rev']*(1-((1+interest_rate)**-(156-max(product_completion_period, product['ILT']))))*(1+interest_rate)/(interest_rate)
-               
-        return product_rev_pv-product_cost_fv, max(product_completion_period, product['ILT'])
+    def evaluate_population(self, population):
+        # an Individual keeps the values of its last evaluation, so unchanged ones (the elite) are not recomputed;
+        # changed ones (offspring, mutants, local search moves) and those without usable values are looked up in the
+        # fitness cache and, on a miss, recomputed for their changed modules and the products using them, or in full
+        self.metrics.count('evaluated_individuals', len(population))
+        arrays = self.module_arrays()
+        version = arrays['version']
+        n_products = len(arrays['products'])
+        product_profit = np.empty((len(population), n_products))
+        launch = np.empty((len(population), n_products))
+
+        uncached = []
+        partial = {}
+        for i, individual in enumerate(population):
+            if isinstance(individual, Individual) and individual.evaluated_with == version:
+                product_profit[i], launch[i] = individual.product_profit, individual.launch
+                changed = individual.changed_modules()
+                if changed:
+                    partial[i] = changed
+            else:
+                uncached.append(i)
+
+        # module values, (len(rows) x n_modules): computed from the genes of the uncached individuals,
+        # taken from the last evaluation of the partial ones with their changed modules recomputed
+        rows = uncached + list(partial)
+        completion = np.empty((len(rows), len(arrays['modules'])))
+        module_cost = np.empty((len(rows), len(arrays['modules'])))
+        if uncached:
+            starts, suppliers, crashes = self.population_to_arrays([population[i] for i in uncached])
+            completion[:len(uncached)], module_cost[:len(uncached)] = self.module_values(starts, suppliers, crashes)
+        if partial:
+            completion[len(uncached):] = [population[i].completion for i in partial]
+            module_cost[len(uncached):] = [population[i].module_cost for i in partial]
+            changed_rows = np.array([len(uncached) + k for k, changed in enumerate(partial.values()) for _ in changed], dtype=np.int64)
+            changed_columns = np.array([arrays['position'][module] for changed in partial.values() for module in changed], dtype=np.int64)
+            genes = [population[i][module] for i, changed in partial.items() for module in changed]
+            gene_starts = np.array([gene[0] for gene in genes], dtype=np.int64)
+            option = np.maximum(np.array([gene[1] or 0 for gene in genes], dtype=np.int64) - 1, 0)
+            gene_crashes = np.array([gene[2] for gene in genes], dtype=np.int64)
+            completion[changed_rows, changed_columns] = gene_starts + arrays['duration'][changed_columns, option] - gene_crashes
+            module_cost[changed_rows, changed_columns] = arrays['cost'][changed_columns, option] + arrays['crash cost'][changed_columns, option] * gene_crashes ** 2
+
+        # (start, supplier, crash) genome of every row: stacked for the uncached individuals, the one of their last
+        # evaluation with the changed modules patched for the partial ones
+        genomes = np.empty((len(rows), len(arrays['modules']), 3), dtype=np.int32)
+        if uncached:
+            genomes[:len(uncached)] = np.stack([starts, suppliers, crashes], axis=2)
+        if partial:
+            genomes[len(uncached):] = [population[i].genome for i in partial]
+            genomes[changed_rows, changed_columns] = np.stack([gene_starts, [gene[1] or 0 for gene in genes], gene_crashes], axis=1)
+
+        # look up every genome, grouping duplicate misses so they are only scored once;
+        # pending maps a genome key (a row without the cache) to the rows sharing it
+        pending = {}
+        if self.fitness_cache.max_size > 0:
+            for r, genome in enumerate(genomes):
+                key = FitnessCache.genome_key(genome)
+                if key in pending:
+                    pending[key].append(r)
+                    self.fitness_cache.hits += 1
+                    continue
+                cached = self.fitness_cache.get(key)
+                if cached is None:
+                    pending[key] = [r]
+                else:
+                    product_profit[rows[r]], launch[rows[r]] = cached
+        else:
+            pending = {r: [r] for r in range(len(rows))}
+
+        # one vectorized pass over the (individual, product) pairs still to compute: every product of an uncached
+        # miss, the products using a changed module of a partial one
+        scored = np.array([indices[0] for indices in pending.values()], dtype=np.int64)
+        full = scored[scored < len(uncached)]
+        incremental = scored[scored >= len(uncached)]
+        pair_rows = np.repeat(full, n_products)
+        pair_products = np.tile(np.arange(n_products), len(full))
+        if len(incremental):
+            changed = np.zeros((len(rows), len(arrays['modules'])), dtype=bool)
+            changed[changed_rows, changed_columns] = True
+            affected_rows, affected_products = np.nonzero(changed[incremental] @ arrays['incidence'].T)
+            pair_rows = np.concatenate([pair_rows, incremental[affected_rows]])
+            pair_products = np.concatenate([pair_products, affected_products])
+        if len(pair_rows):
+            pair_population = np.asarray(rows)[pair_rows]
+            product_profit[pair_population, pair_products], launch[pair_population, pair_products] = \
+                self.product_values(completion, module_cost, pair_rows, pair_products)
+            self.metrics.count('incremental_evaluations', len(incremental))
+            self.metrics.count('evaluated_products', len(pair_products))
+
+        for key, indices in pending.items():
+            first = rows[indices[0]]
+            if self.fitness_cache.max_size > 0:
+                self.fitness_cache.put(key, (product_profit[first].copy(), launch[first].copy()))
+            for r in indices[1:]:
+                product_profit[rows[r]], launch[rows[r]] = product_profit[first], launch[first]
+
+        for r, i in enumerate(rows):
+            if isinstance(population[i], Individual):
+                population[i].evaluated(completion[r].copy(), module_cost[r].copy(), product_profit[i].copy(), launch[i].copy(), genomes[r].copy(), version)
+
+        return self.family_selection(product_profit, launch)
 
     def select_parents(self, population, fitness_scores):
         # select parents based on their fitness probabilities
@@ -192,7 +502,7 @@ class GeneticAlgorithm:
         return elite_parents
 
     def contest_select(self, population, fitness_scores, contest_size=3):
-        selected_indices = random.sample(range(len(population)), contest_size)
+        selected_indices = self.rng.sample(range(len(population)), contest_size)
         selected_fitness = [fitness_scores[i] for i in selected_indices]
         best_index = selected_indices[selected_fitness.index(min(selected_fitness))]
         
@@ -205,19 +515,11 @@ class GeneticAlgorithm:
         offspring1, offspring2 = parent1.copy(), parent2.copy()
         
         while swap_count < half_modules and modules_to_swap:
-            module = random.choice(modules_to_swap)
+            module = self.rng.choice(modules_to_swap)
             # tentatively swap the modules
             offspring1[module], offspring2[module] = offspring2[module], offspring1[module]
-            check_passed = True
-            
-            for i in list(parent1.keys()):
-                start_period1, start_period2 = offspring1[i][0], offspring2[i][0]
-                
-                # check if swapping the target module maintains the precedence constraints
-                if not (self.check_precedence(start_period1, i, offspring1) and 
-                        self.check_precedence(start_period2, i, offspring2)):
-                    check_passed = False
-                    break
+            # check if swapping the target module maintains the precedence constraints
+            check_passed = self.check_local_precedence(module, offspring1) and self.check_local_precedence(module, offspring2)
 
             if check_passed:
                 swap_count += 1
@@ -228,8 +530,10 @@ class GeneticAlgorithm:
             # remove the module from the list to avoid repetitive checks
             modules_to_swap.remove(module)
 
-        # if less than 6 swaps were made, discard the offspring by returning None
-        if swap_count < 6:
+        # if less than half of the modules were swapped, discard the offspring by returning None
+        self.metrics.count('crossovers')
+        if swap_count < half_modules:
+            self.metrics.count('discarded_crossovers')
             return None, None
 
         return offspring1, offspring2
@@ -241,7 +545,7 @@ class GeneticAlgorithm:
         for _ in range(len(parents)):
             parent1 = self.contest_select(parents, fitness_scores, 3)
             parent2 = self.contest_select(parents, fitness_scores, 3)
-            if random.random() < crossover_rate:
+            if self.rng.random() < crossover_rate:
                 offspring1, offspring2 = self.uniform_crossover(parent1, parent2)
                 if offspring1 is not None and offspring2 is not None:
                     offspring.append(offspring1)
@@ -253,126 +557,238 @@ class GeneticAlgorithm:
 
     def mutation(self, offspring, mutation_rate):
         for individual in offspring:
-            if random.random() < mutation_rate:
+            if self.rng.random() < mutation_rate:
                 # randomly select a module to mutate
-                module = random.choice(list(individual.keys()))
+                module = self.rng.choice(list(individual.keys()))
+                original_gene = individual[module]
+                self.metrics.count('mutations')
                 
                 # mutating the in-house modules
                 if self.module_profile[module]['type'] == 'inhouse':
                     max_crash = int(self.module_profile[module]['max crash'][0])
-                    crash_period = random.choice([x for x in range(0, max_crash + 1) if x != individual[module][2]]) if max_crash > 0 else 0
+                    crash_period = self.rng.choice([x for x in range(0, max_crash + 1) if x != individual[module][2]]) if max_crash > 0 else 0
                     duration = self.module_profile[module]['duration'][0] - crash_period
                     
-                    # attempt to find a valid new start period
-                    available_periods = list(range(1, int(156 - duration + 1)))
-                    random.shuffle(available_periods)
+                    # attempt to find a valid new start period among the resource-feasible ones
+                    available_periods = list(self.valid_starts(module, duration))
+                    self.rng.shuffle(available_periods)
                     valid_mutation = False
                     
                     for new_start_period in available_periods:
-                        if self.check_precedence(new_start_period, module, individual) and \
-                        self.check_resource_availability(new_start_period, duration, module):
+                        if self.check_precedence(new_start_period, module, individual):
                             
                             individual[module] = [new_start_period, None, crash_period, new_start_period + duration]
-                            check_passed = True
                             # check if mutation does not make successors invalid
-                            for i in list(individual.keys()):
-                                start_period = individual[i][0]
-                
-                                if not self.check_precedence(start_period, i, individual):
-                                    check_passed = False
-                                    break
-                            if check_passed:
+                            if self.check_local_precedence(module, individual):
                                 valid_mutation = True
                                 break
                     
                     if not valid_mutation:
                         # if no valid mutation is found, do not change the individual
+                        individual[module] = original_gene
+                        self.metrics.count('failed_mutations')
                         continue
                     
                 # mutating outsourced modules
                 else:
-                    new_supplier = random.choice(self.module_profile[module]['supplier'])
+                    new_supplier = self.rng.choice(self.module_profile[module]['supplier'])
                     lead_time = self.module_profile[module]['duration'][new_supplier - 1]
                     max_crash = int(self.module_profile[module]['max crash'][new_supplier - 1])
-                    crash_period = random.choice([x for x in range(0, max_crash + 1) if x != individual[module][2]]) if max_crash > 0 else 0
+                    crash_period = self.rng.choice([x for x in range(0, max_crash + 1) if x != individual[module][2]]) if max_crash > 0 else 0
                     lead_time -= crash_period
                     
                     # Attempt to find a valid new start period
-                    available_periods = list(range(1, int(156 - lead_time + 1)))
-                    random.shuffle(available_periods)
+                    available_periods = list(range(1, int(self.horizon - lead_time + 1)))
+                    self.rng.shuffle(available_periods)
                     valid_mutation = False
                     
                     for new_start_period in available_periods:
                         if self.check_precedence(new_start_period, module, individual):
                             individual[module] = [new_start_period, new_supplier, crash_period, new_start_period + lead_time]
-                            check_passed = True
                             # check if mutation does not make successors invalid
-                            for i in list(individual.keys()):
-                                start_period = individual[i][0]
-                
-                                if not self.check_precedence(start_period, i, individual):
-                                    check_passed = False
-                                    break
-                            if check_passed:
+                            if self.check_local_precedence(module, individual):
                                 valid_mutation = True
                                 break
                     
                     if not valid_mutation:
                         # if no valid mutation is found, do not change the individual
+                        individual[module] = original_gene
+                        self.metrics.count('failed_mutations')
                         continue
 
         return offspring
     
-    def run(self, pop_size, crossover_rate, mutation_rate, num_generations):
-        # initialize population
-        population = self.initialize_population(pop_size)
+    def neighbours(self, individual):
+        # every feasible individual one move away: a module's crash one period up or down, another supplier,
+        # or its start moved to the previous or next resource-feasible start for that duration
+        moves = []
+        for module in self.modules:
+            start, supplier, crash_period, _ = individual[module]
+            profile = self.module_profile[module]
+            for new_supplier in ([None] if supplier is None else profile['supplier']):
+                option_index = 0 if new_supplier is None else new_supplier - 1
+                max_crash = int(profile['max crash'][option_index])
+                crash_periods = [crash_period - 1, crash_period, crash_period + 1] if new_supplier == supplier else [min(crash_period, max_crash)]
+                for new_crash in crash_periods:
+                    if new_crash < 0 or new_crash > max_crash:
+                        continue
+                    duration = profile['duration'][option_index] - new_crash
+                    starts = self.valid_starts(module, duration)
+                    # the nearest valid starts before and after the current one, and the current one if still valid
+                    position = bisect.bisect_left(starts, start)
+                    candidates = starts[max(0, position - 1):position]
+                    after = position + 1 if position < len(starts) and starts[position] == start else position
+                    candidates += starts[position:after + 1]
+                    for new_start in candidates:
+                        if (new_start, new_supplier, new_crash) == (start, supplier, crash_period):
+                            continue
+                        neighbour = individual.copy()
+                        neighbour[module] = [new_start, new_supplier, new_crash, int(new_start + duration)]
+                        if self.check_local_precedence(module, neighbour):
+                            moves.append(neighbour)
+        return moves
+
+    def local_search(self, individual, fitness, max_steps=None, stopping=None, cancel_event=None):
+        # steepest-ascent hill climbing over neighbours(), scoring each whole neighbourhood in one batch;
+        # returns the improved individual, its fitness and product selection (None when nothing improved)
+        # the climb ends early, keeping its best so far, once the time budget of stopping is spent
+        product_selection = None
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RunCancelled()
+            if stopping is not None and stopping.remaining() == 0:
+                break
+            moves = self.neighbours(individual)
+            if not moves:
+                break
+            profits, selected, family_profit, family_launch = self.evaluate_population(moves)
+            self.metrics.count('local_search_evaluations', len(moves))
+            best = int(np.argmax(profits))
+            if profits[best] <= fitness:
+                break
+            individual, fitness = moves[best], profits[best].item()
+            product_selection = self.product_selection(selected[best], family_profit[best], family_launch[best])
+            self.metrics.count('local_search_moves')
+            steps += 1
+        return individual, fitness, product_selection
+
+    def refine_best(self, individual, fitness, product_selection, stopping=None, cancel_event=None):
+        # climb the final best individual further, for up to final_search_steps moves within the time budget
+        if self.local_search_top_k <= 0 or individual is None:
+            return individual, fitness, product_selection
+        with self.metrics.phase('local_search'):
+            refined, refined_fitness, refined_selection = self.local_search(individual, fitness, self.final_search_steps, stopping, cancel_event)
+        if refined_fitness > fitness:
+            return refined, refined_fitness, refined_selection
+        return individual, fitness, product_selection
+
+    def run(self, pop_size, crossover_rate, mutation_rate, num_generations, progress_callback=None, cancel_event=None, stopping=None,
+            checkpoint=None, resume=None, seed_population=None):
+        # checkpoint (a Checkpointer) saves the run every few generations and once it ends
+        # resume (a loaded checkpoint of the same run) continues exactly where that checkpoint left off
+        # seed_population warm-starts the run from individuals of an earlier run, repaired for the current inputs
+        # the time budget of stopping also covers building the initial population
+        if stopping is not None:
+            stopping.start()
+
+        if resume is not None:
+            self.rng.setstate(resume['rng_state'])
+            population = self.arrays_to_population(resume['starts'], resume['suppliers'], resume['crashes'])
+            first_generation = resume['generation']
+            best = (resume['best_individual'], resume['best_fitness'], resume['best_product_selection'])
+        else:
+            # initialize population
+            population = self.initialize_population(pop_size, seed_population)
+            first_generation = 0
+            best = None
+
+        population, global_best_individual, global_best_fitness, global_best_product_selection = self.evolve(
+            population, crossover_rate, mutation_rate, num_generations, progress_callback, cancel_event, stopping,
+            checkpoint, first_generation, best)
+        global_best_individual, global_best_fitness, global_best_product_selection = self.refine_best(
+            global_best_individual, global_best_fitness, global_best_product_selection, stopping, cancel_event)
+
+        if checkpoint is not None:
+            generations = first_generation + (num_generations - first_generation if stopping is None else stopping.generations)
+            checkpoint.save(self, generations, population, global_best_individual, global_best_fitness, global_best_product_selection)
 
+        return global_best_individual, global_best_fitness, global_best_product_selection
+
+    def evolve(self, population, crossover_rate, mutation_rate, num_generations, progress_callback=None, cancel_event=None, stopping=None,
+               checkpoint=None, first_generation=0, best=None):
+        # evolve an existing population, returning the final population and the best individual seen
+        # progress_callback(generation, best_fitness, global_best_fitness) is called after every generation
+        # stopping (a StoppingCriteria) can end the run before num_generations, it records why the run stopped
+        # checkpoint is saved every checkpoint.interval generations, after evaluating and before breeding, so that
+        # a resumed run (first_generation and best taken from the checkpoint) repeats the same generations
         # initialize best individual tracking
-        global_best_fitness = -float('inf')
-        global_best_individual = None
-        global_best_product_selection = None
+        global_best_individual, global_best_fitness, global_best_product_selection = best or (None, -float('inf'), None)
+
+        for generation in range(first_generation, num_generations):
+            if cancel_event is not None and cancel_event.is_set():
+                raise RunCancelled()
+
+            self.metrics.start_generation()
 
-        for generation in range(num_generations):
-            # evaluate fitness for each individual
-            fitness_results = [self.fitness_function(individual) for individual in population]
-            fitness_scores = [result[0] for result in fitness_results]
-            product_selections = [result[1] for result in fitness_results]
+            # evaluate fitness for the whole population in one batch
+            with self.metrics.phase('fitness'):
+                profits, selected, family_profit, family_launch = self.evaluate_population(population)
+                fitness_scores = profits.tolist()
 
             # check and update the best individual and fitness
-            for ind, (fitness, product_selection) in enumerate(zip(fitness_scores, product_selections)):
+            for ind, fitness in enumerate(fitness_scores):
                 if fitness > global_best_fitness:
                     global_best_fitness = fitness
                     global_best_individual = population[ind]
-                    global_best_product_selection = product_selection
+                    global_best_product_selection = self.product_selection(selected[ind], family_profit[ind], family_launch[ind])
+
+            # refine the best individuals in place so selection breeds from the improved ones
+            if self.local_search_top_k > 0:
+                with self.metrics.phase('local_search'):
+                    top = sorted(range(len(population)), key=fitness_scores.__getitem__, reverse=True)[:self.local_search_top_k]
+                    for ind in top:
+                        individual, fitness, product_selection = self.local_search(
+                            population[ind], fitness_scores[ind], self.local_search_steps, stopping, cancel_event)
+                        if fitness > fitness_scores[ind]:
+                            population[ind], fitness_scores[ind] = individual, fitness
+                            if fitness > global_best_fitness:
+                                global_best_individual, global_best_fitness, global_best_product_selection = individual, fitness, product_selection
+
+            # report generation number and best fitness
+            if progress_callback is not None:
+                progress_callback(generation, max(fitness_scores), global_best_fitness)
+
+            # stop before breeding so the returned population is the one just evaluated
+            if stopping is not None and stopping.update(global_best_fitness):
+                break
+
+            if checkpoint is not None and generation > first_generation and generation % checkpoint.interval == 0:
+                checkpoint.save(self, generation, population, global_best_individual, global_best_fitness, global_best_product_selection)
 
             # selection
-            elite_parents = self.select_parents(population, fitness_scores)
-            
+            with self.metrics.phase('selection'):
+                elite_parents = self.select_parents(population, fitness_scores)
+
             # crossover
-            offspring = self.crossover(population, fitness_scores, crossover_rate)
-            
+            with self.metrics.phase('crossover'):
+                offspring = self.crossover(population, fitness_scores, crossover_rate)
+
             # mutation
-            offspring = self.mutation(offspring, mutation_rate)
+            with self.metrics.phase('mutation'):
+                offspring = self.mutation(offspring, mutation_rate)
             
             population = elite_parents + offspring
 
-            # Print generation number and best fitness
-            print(f"Generation {generation}: Best fitness = {max(fitness_scores)}")
-
-        return global_best_individual, global_best_fitness, global_best_product_selection
+        return population, global_best_individual, global_best_fitness, global_best_product_selection
 
     def update_module_duration(self):
-        self.information_flow = self.information_flow.replace('-', np.nan).astype(float)
+        # Find the maximum flow affecting each module (its row, ignoring missing entries)
+        flows = np.where(np.isnan(self.information_flow), -np.inf, self.information_flow).max(axis=1)
 
-        for module in self.module_profile.keys():
-            # Get the column for the current module (successor)
-            flow_values = self.information_flow.loc[module]
-
-            # Find the maximum flow affecting the module (ignoring NaN values)
-            max_flow = flow_values.max()
-
-            # Update the durations if max flow is valid
-            if not np.isnan(max_flow):
+        for module, max_flow in zip(self.modules, flows.tolist()):
+            # Update the durations if the module has any flow entry
+            if max_flow != -np.inf:
                 updated_durations = []
                 for duration in self.module_profile[module]['duration']:
                     updated_duration = int(duration + (max_flow / 100) * duration)
@@ -380,4 +796,9 @@ class GeneticAlgorithm:
 
                 # Update the module's duration with the new calculated values
                 self.module_profile[module]['duration'] = updated_durations
+
+        # durations changed, recompile the module arrays and schedule windows and drop cached fitness on next use
+        self._module_arrays = None
+        self._schedule_windows = None
+        self.fitness_cache.clear()
             
\ No newline at end of file
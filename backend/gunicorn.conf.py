@@ -0,0 +1,27 @@
+# gunicorn settings for serving wsgi:app, each one overridable through the environment.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Workers share the per-period data of the dataset through memory-mapped arrays next to its snapshot, and the
+# small per-module dicts through copy-on-write pages of the preloaded master, so adding workers adds little memory.
+# GA jobs and /metrics totals live in the worker process that received the request, so a job submitted to one
+# worker is unknown to the others: with the job endpoints enabled (GA_JOBS, the default) the app is served by a
+# single worker. GA_JOBS=0 drops the job endpoints and serves the synchronous ones from GA_WORKERS workers
+# (default 2), each reporting only its own runs on /metrics.
+import gc
+import os
+
+bind = os.environ.get('GA_BIND', '0.0.0.0:5000')
+jobs_enabled = os.environ.get('GA_JOBS', '1') != '0'
+workers = int(os.environ.get('GA_WORKERS', 1 if jobs_enabled else 2))
+if jobs_enabled and workers > 1:
+    raise ValueError(f"GA_WORKERS={workers} with the job endpoints enabled: jobs are kept per worker, set GA_JOBS=0 to run several workers")
+threads = int(os.environ.get('GA_THREADS', 4))
+# GA runs are long requests
+timeout = int(os.environ.get('GA_TIMEOUT', 600))
+preload_app = True
+
+def when_ready(server):
+    # everything the preloaded app allocated is long-lived; freezing it keeps the collector from touching (and so
+    # copying) those pages in every worker
+    gc.freeze()
@@ -0,0 +1,36 @@
+from itertools import compress
+from operator import is_not
+
+class Individual(dict):
+    # a schedule {module: [start, supplier, crash, end]} that carries the values of its last evaluation (per-module
+    # completion and cost, per-product profit and launch period, the genome array of its fitness cache key), so
+    # re-evaluating it only recomputes the modules changed since then and the products using them; operators always
+    # replace a module's gene list rather than modify it, so a changed module is one whose gene is no longer the
+    # object it was at the last evaluation
+    __slots__ = ('completion', 'module_cost', 'product_profit', 'launch', 'genome', 'evaluated_with', 'evaluated_modules', 'evaluated_genes')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.completion = self.module_cost = self.product_profit = self.launch = self.genome = None
+        # the module arrays the values were computed with, they are only reused with the same ones
+        self.evaluated_with = None
+        self.evaluated_modules = self.evaluated_genes = None
+
+    def copy(self):
+        # the copy shares the evaluated values, which are always replaced and never modified in place
+        other = Individual(self)
+        for name in Individual.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def changed_modules(self):
+        modules = tuple(self)
+        if modules != self.evaluated_modules:
+            return list(modules)
+        return list(compress(modules, map(is_not, self.values(), self.evaluated_genes)))
+
+    def evaluated(self, completion, module_cost, product_profit, launch, genome, evaluated_with):
+        self.completion, self.module_cost, self.product_profit, self.launch = completion, module_cost, product_profit, launch
+        self.genome = genome
+        self.evaluated_with = evaluated_with
+        self.evaluated_modules, self.evaluated_genes = tuple(self), tuple(self.values())
@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import nullcontext
+
+# phases timed inside every generation; initialization happens once per run
+GENERATION_PHASES = ('fitness', 'local_search', 'selection', 'crossover', 'mutation')
+PHASES = ('initialization',) + GENERATION_PHASES
+
+# operator outcome counters
+COUNTERS = (
+    'generated_individuals', 'repaired_individuals',
+    'crossovers', 'discarded_crossovers',
+    'mutations', 'failed_mutations',
+    'local_search_moves', 'local_search_evaluations',
+    'evaluated_individuals', 'incremental_evaluations', 'evaluated_products'
+)
+
+class _Phase:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.name, time.perf_counter() - self.started)
+
+class RunMetrics:
+    # phase timings and operator counters of a single run, per generation and in total
+    enabled = True
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.generations = []
+        self.current = None
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        self.phases[name] += seconds
+        if self.current is not None and name in self.current:
+            self.current[name] += seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def start_generation(self):
+        self.current = dict.fromkeys(GENERATION_PHASES, 0.0)
+        self.generations.append(self.current)
+
+    def merge(self, data, generation_offset=0):
+        # add the metrics of another run (e.g. an island epoch) whose generations start at generation_offset
+        for name, seconds in data['phases'].items():
+            self.phases[name] += seconds
+        for name, amount in data['counters'].items():
+            self.counters[name] += amount
+        for i, generation in enumerate(data['generations']):
+            while len(self.generations) <= generation_offset + i:
+                self.generations.append(dict.fromkeys(GENERATION_PHASES, 0.0))
+            for name, seconds in generation.items():
+                self.generations[generation_offset + i][name] += seconds
+
+    def to_dict(self):
+        return {'phases': dict(self.phases), 'counters': dict(self.counters), 'generations': [dict(g) for g in self.generations]}
+
+class NullMetrics:
+    # stands in for RunMetrics when instrumentation is off, every hook is a no-op
+    enabled = False
+    _phase = nullcontext()
+
+    def phase(self, name):
+        return self._phase
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def start_generation(self):
+        pass
+
+    def merge(self, data, generation_offset=0):
+        pass
+
+    def to_dict(self):
+        return None
+
+NULL_METRICS = NullMetrics()
+
+class MetricsRegistry:
+    # process-wide totals over all runs, rendered in the Prometheus text exposition format
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs = {}
+        self.result_cache = {}
+        self.run_seconds = 0.0
+        self.generations = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def observe_run(self, status, seconds=0.0, metrics=None, generations=0, result_cache=None):
+        with self.lock:
+            self.runs[status] = self.runs.get(status, 0) + 1
+            if result_cache is not None:
+                self.result_cache[result_cache] = self.result_cache.get(result_cache, 0) + 1
+            self.run_seconds += seconds
+            self.generations += generations
+            if metrics is not None:
+                for name, value in metrics['phases'].items():
+                    self.phases[name] += value
+                for name, value in metrics['counters'].items():
+                    self.counters[name] += value
+
+    def render(self, job_counts=None):
+        # job_counts: {status: count} of the job queue, sampled at scrape time
+        with self.lock:
+            lines = [
+                '# HELP ga_runs_total GA runs by outcome.',
+                '# TYPE ga_runs_total counter'
+            ]
+            lines += [f'ga_runs_total{{status="{status}"}} {count}' for status, count in sorted(self.runs.items())]
+            lines += [
+                '# HELP ga_result_cache_total Seeded result cache lookups by outcome.',
+                '# TYPE ga_result_cache_total counter'
+            ]
+            lines += [f'ga_result_cache_total{{outcome="{outcome}"}} {count}' for outcome, count in sorted(self.result_cache.items())]
+            lines += [
+                '# HELP ga_run_seconds_total Wall-clock time spent executing GA runs.',
+                '# TYPE ga_run_seconds_total counter',
+                f'ga_run_seconds_total {self.run_seconds}',
+                '# HELP ga_generations_total Generations evolved over all runs.',
+                '# TYPE ga_generations_total counter',
+                f'ga_generations_total {self.generations}',
+                '# HELP ga_phase_seconds_total Time spent in each GA phase over all instrumented runs.',
+                '# TYPE ga_phase_seconds_total counter'
+            ]
+            lines += [f'ga_phase_seconds_total{{phase="{name}"}} {value}' for name, value in self.phases.items()]
+            lines += [
+                '# HELP ga_operator_events_total Operator outcomes over all instrumented runs.',
+                '# TYPE ga_operator_events_total counter'
+            ]
+            lines += [f'ga_operator_events_total{{event="{name}"}} {value}' for name, value in self.counters.items()]
+        if job_counts is not None:
+            lines += ['# HELP ga_jobs Background jobs by current status.', '# TYPE ga_jobs gauge']
+            lines += [f'ga_jobs{{status="{status}"}} {count}' for status, count in job_counts.items()]
+        return '\n'.join(lines) + '\n'
+
+# shared by the Flask app and the background job workers
+registry = MetricsRegistry()
@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from genetic_algorithm import ParameterError, RunCancelled
+from instrumentation import RunMetrics
+from stopping import StoppingCriteria
+
+MIGRATION_POLICIES = ('ring', 'broadcast', 'random')
+
+# modules the fork server imports once, so the pool workers forked from it start with them loaded; the main script
+# is the default, kept here (worker processes otherwise import it themselves)
+POOL_PRELOAD = ['__main__', 'island_model', 'sweep']
+
+def pool_context():
+    # worker pools are started from request and job threads, and forking a process with other threads running can
+    # deadlock the child on a lock one of them held (BLAS, logging, the dataset lock); the workers are forked from a
+    # single-threaded fork server instead, or spawned where there is none. Their initializer arguments are pickled
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(POOL_PRELOAD)
+    return context
+
+# each worker process keeps its own copy of the GA (and its fitness cache) for the lifetime of the pool
+_worker_ga = None
+
+def _init_worker(ga):
+    global _worker_ga
+    _worker_ga = ga
+
+def stream_seed(seed_sequence):
+    # a 128-bit seed for random.Random from a spawned numpy SeedSequence
+    return int.from_bytes(seed_sequence.generate_state(4).tobytes(), 'little')
+
+def _evolve_island(population, pop_size, crossover_rate, mutation_rate, num_generations, seed, target_fitness=None, deadline=None):
+    ga = _worker_ga
+    ga.rng.seed(seed)
+    hits, misses = ga.fitness_cache.hits, ga.fitness_cache.misses
+    if ga.metrics.enabled:
+        ga.metrics = RunMetrics()
+
+    # stagnation is judged on the global best between epochs, only the target and the time left can cut an epoch short
+    # islands may queue behind each other on fewer workers, so the time left is taken from a shared wall-clock deadline
+    stopping = None
+    if target_fitness is not None or deadline is not None:
+        time_budget = None if deadline is None else deadline - time.time()
+        stopping = StoppingCriteria(target_fitness=target_fitness, time_budget=time_budget).start()
+
+    if population is None:
+        population = ga.initialize_population(pop_size)
+    population, best_individual, best_fitness, best_product_selection = ga.evolve(population, crossover_rate, mutation_rate, num_generations, stopping=stopping)
+    generations = num_generations if stopping is None else stopping.generations
+
+    # score the final population so the parent can pick emigrants and track the best of the last offspring
+    profits, selected, family_profit, family_launch = ga.evaluate_population(population)
+    order = profits.argsort()[::-1]
+    if profits[order[0]] > best_fitness:
+        best_fitness = profits[order[0]].item()
+        best_individual = population[order[0]]
+        best_product_selection = ga.product_selection(selected[order[0]], family_profit[order[0]], family_launch[order[0]])
+
+    population = [population[i] for i in order]
+    fitness_scores = [profits[i].item() for i in order]
+    cache_stats = {'hits': ga.fitness_cache.hits - hits, 'misses': ga.fitness_cache.misses - misses}
+
+    return population, fitness_scores, best_individual, best_fitness, best_product_selection, cache_stats, generations, ga.metrics.to_dict()
+
+def migrate(populations, fitness_scores, migration_size, migration_policy, rng=random):
+    # populations are sorted best first; emigrants replace the worst individuals of their destination
+    islands = len(populations)
+    if islands < 2 or migration_size <= 0:
+        return [0] * islands
+
+    if migration_policy == 'ring':
+        routes = [(i, (i + 1) % islands) for i in range(islands)]
+    elif migration_policy == 'broadcast':
+        source = max(range(islands), key=lambda i: fitness_scores[i][0])
+        routes = [(source, i) for i in range(islands) if i != source]
+    elif migration_policy == 'random':
+        routes = [(i, rng.choice([j for j in range(islands) if j != i])) for i in range(islands)]
+    else:
+        raise ParameterError(f"Unknown migration policy '{migration_policy}', expected one of {MIGRATION_POLICIES}")
+
+    # take every emigrant before replacing anything so a route never forwards newly arrived migrants; the copies keep
+    # the values of their last evaluation, so a migrant is not re-evaluated on arrival
+    emigrants = {source: [individual.copy() for individual in populations[source][:migration_size]] for source, _ in routes}
+    received = [0] * islands
+    for source, destination in routes:
+        count = min(migration_size, len(populations[destination]))
+        if count == 0:
+            continue
+        populations[destination][-count:] = emigrants[source][:count]
+        received[destination] += count
+
+    return received
+
+def run_islands(ga, pop_size, crossover_rate, mutation_rate, num_generations, islands=4,
+                migration_interval=10, migration_size=2, migration_policy='ring', max_workers=None,
+                progress_callback=None, cancel_event=None, stopping=None):
+    if migration_policy not in MIGRATION_POLICIES:
+        raise ParameterError(f"Unknown migration policy '{migration_policy}', expected one of {MIGRATION_POLICIES}")
+    migration_interval = max(1, migration_interval)
+
+    populations = [None] * islands
+    fitness_scores = [None] * islands
+    island_stats = [{'island': i, 'best_fitness': -float('inf'), 'best_fitness_by_epoch': [], 'migrants_received': 0} for i in range(islands)]
+    cache_stats = {'hits': 0, 'misses': 0}
+
+    global_best_fitness = -float('inf')
+    global_best_individual = None
+    global_best_product_selection = None
+
+    if stopping is not None:
+        stopping.start()
+
+    # every island epoch draws from its own stream spawned from the run's generator, so the islands never share
+    # or overlap random states and a seeded run repeats exactly however the epochs are scheduled on the workers
+    streams = np.random.SeedSequence(ga.rng.getrandbits(128))
+
+    # compiled once here, so every worker evaluates against the same module arrays (and version) and the individuals
+    # passed between the workers and this process keep their evaluated values
+    ga.module_arrays()
+
+    workers = min(islands, max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=_init_worker, initargs=(ga,)) as pool:
+        completed = 0
+        while completed < num_generations:
+            if cancel_event is not None and cancel_event.is_set():
+                raise RunCancelled()
+
+            epoch = min(migration_interval, num_generations - completed)
+            target_fitness = None if stopping is None else stopping.target_fitness
+            remaining = None if stopping is None else stopping.remaining()
+            deadline = None if remaining is None else time.time() + remaining
+            futures = [
+                pool.submit(_evolve_island, populations[i], pop_size, crossover_rate, mutation_rate, epoch, stream_seed(stream),
+                            target_fitness, deadline)
+                for i, stream in enumerate(streams.spawn(islands))
+            ]
+
+            epoch_generations = 0
+            for i, future in enumerate(futures):
+                population, scores, best_individual, best_fitness, best_product_selection, stats, generations, metrics = future.result()
+                if metrics is not None:
+                    ga.metrics.merge(metrics, completed)
+                epoch_generations = max(epoch_generations, generations)
+                populations[i], fitness_scores[i] = population, scores
+                cache_stats['hits'] += stats['hits']
+                cache_stats['misses'] += stats['misses']
+
+                island_stats[i]['best_fitness_by_epoch'].append(best_fitness)
+                if best_fitness > island_stats[i]['best_fitness']:
+                    island_stats[i]['best_fitness'] = best_fitness
+                if best_fitness > global_best_fitness:
+                    global_best_fitness = best_fitness
+                    global_best_individual = best_individual
+                    global_best_product_selection = best_product_selection
+
+            completed += epoch_generations
+            if progress_callback is not None:
+                progress_callback(completed - 1, max(scores[0] for scores in fitness_scores), global_best_fitness)
+
+            if stopping is not None and stopping.update(global_best_fitness, epoch_generations):
+                break
+            if completed < num_generations:
+                received = migrate(populations, fitness_scores, migration_size, migration_policy, ga.rng)
+                for i, count in enumerate(received):
+                    island_stats[i]['migrants_received'] += count
+
+    global_best_individual, global_best_fitness, global_best_product_selection = ga.refine_best(
+        global_best_individual, global_best_fitness, global_best_product_selection, stopping, cancel_event)
+
+    for i in range(islands):
+        island_stats[i]['final_mean_fitness'] = sum(fitness_scores[i]) / len(fitness_scores[i]) if fitness_scores[i] else None
+
+    return global_best_individual, global_best_fitness, global_best_product_selection, island_stats, cache_stats
@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from genetic_algorithm import RunCancelled
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.events = []
+        self.cancel_event = threading.Event()
+        self.condition = threading.Condition()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def publish(self, event, data):
+        with self.condition:
+            self.events.append((event, data))
+            self.condition.notify_all()
+
+    def finish(self, status, result=None, error=None):
+        with self.condition:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append((status, {'status': status, 'error': error}))
+            self.condition.notify_all()
+
+    def wait_for_events(self, start, timeout=15):
+        # block until there are events past start or the job is finished, returns the new events
+        with self.condition:
+            if len(self.events) <= start and not self.finished:
+                self.condition.wait(timeout)
+            return self.events[start:]
+
+    def to_dict(self):
+        progress = next((data for event, data in reversed(self.events) if event == 'progress'), None)
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'progress': progress,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class JobManager:
+    # runs GA jobs on a background thread pool so request threads return immediately
+    def __init__(self, run_function, max_workers=2, max_finished_jobs=100):
+        self.run_function = run_function
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ga-job')
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, params):
+        job = Job(params)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self.executor.submit(self._execute, job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        # a queued job is finished right away, a running one stops at its next generation
+        with job.condition:
+            if job.status == 'queued':
+                job.finish('cancelled')
+        return job
+
+    def status_counts(self):
+        with self.lock:
+            counts = dict.fromkeys(('queued', 'running', 'completed', 'failed', 'cancelled'), 0)
+            for job in self.jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _execute(self, job):
+        with job.condition:
+            if job.finished:
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+
+        def progress_callback(generation, best_fitness, global_best_fitness):
+            job.publish('progress', {'generation': generation, 'best_fitness': best_fitness, 'global_best_fitness': global_best_fitness})
+
+        try:
+            result = self.run_function(job.params, progress_callback=progress_callback, cancel_event=job.cancel_event)
+            job.finish('completed', result=result)
+        except RunCancelled:
+            job.finish('cancelled')
+        except Exception as e:
+            job.finish('failed', error=str(e))
+
+    def _prune(self):
+        # drop the oldest finished jobs once over the retention limit
+        finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job.id]
@@ -0,0 +1,363 @@
+# Load test of the HTTP API: starts the app locally (or targets a running one), sends a reproducible mix of
+# concurrent requests and reports throughput, latency percentiles, error rates and peak memory per process.
+#
+#   python loadtest.py --output load.json
+#   python loadtest.py --server gunicorn --workers 4 --concurrency 8 --requests 200 --output new.json --compare load.json
+#   python loadtest.py --url http://127.0.0.1:5000 --pid <server pid>
+#
+# Results are written as JSON so runs from different commits or server settings can be diffed or compared.
+# Memory is read from /proc, so it is only reported on Linux and for a server started here or given with --pid.
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmark import git_commit, parse_list
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+ENDPOINTS = ('run-ga', 'get-preprocessed-data')
+
+def parse_mix(value):
+    # "run-ga=3,get-preprocessed-data=1" -> {'run-ga': 3.0, 'get-preprocessed-data': 1.0}
+    mix = {}
+    for item in parse_list(value, str):
+        endpoint, _, weight = item.partition('=')
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{endpoint}', expected one of {ENDPOINTS}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(server, port, workers, threads, log_path):
+    # the Flask development server runs one threaded process, gunicorn a preloaded master and its workers
+    env = dict(os.environ)
+    if server == 'gunicorn':
+        # the load mix uses no job endpoints, which are per worker and so refused with several workers
+        env.update({'GA_BIND': f'127.0.0.1:{port}', 'GA_WORKERS': str(workers), 'GA_THREADS': str(threads), 'GA_JOBS': '0'})
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, '-c', f"from app import create_app; create_app(warm_up=True).run(host='127.0.0.1', port={port}, threaded=True)"]
+    log = open(log_path, 'ab')
+    try:
+        return subprocess.Popen(command, cwd=current_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    finally:
+        log.close()
+
+def wait_until_ready(url, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode} before it was ready")
+        try:
+            with urllib.request.urlopen(url + '/metrics', timeout=5) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} not ready after {timeout}s")
+
+def process_children():
+    # {ppid: [pid, ...]} of every process visible in /proc
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name may contain spaces and parentheses, the parent pid is the second field after it
+        ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+def process_memory(pid):
+    # current and peak resident set size in MB
+    memory = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                memory[line[:5]] = int(line.split()[1]) / 1024
+    return memory.get('VmRSS', 0.0), memory.get('VmHWM', 0.0)
+
+class MemorySampler:
+    # samples the resident memory of a server process and all its descendants (gunicorn workers, island and sweep
+    # pools) until stopped; processes that exit during the test keep the peak seen while they were alive
+    def __init__(self, pid, workers=True, interval=0.2):
+        self.pid = pid
+        # the roles of the processes by their depth below the server, a single-process server has no workers
+        self.roles = ('server', 'worker', 'pool') if workers else ('server', 'pool')
+        self.interval = interval
+        self.processes = {}
+        self.peak_total_rss = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        return self.to_dict()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        children = process_children()
+        # (pid, depth) breadth first
+        tree = [(self.pid, 0)]
+        for pid, depth in tree:
+            tree.extend((child, depth + 1) for child in children.get(pid, []))
+
+        total = 0.0
+        for pid, depth in tree:
+            try:
+                rss, peak = process_memory(pid)
+            except OSError:
+                continue
+            total += rss
+            entry = self.processes.setdefault(pid, {'pid': pid, 'role': self.roles[min(depth, len(self.roles) - 1)], 'peak_rss_mb': 0.0})
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'], peak)
+        self.peak_total_rss = max(self.peak_total_rss, total)
+
+    def to_dict(self):
+        processes = sorted(self.processes.values(), key=lambda entry: (self.roles.index(entry['role']), -entry['peak_rss_mb']))
+        workers = [entry['peak_rss_mb'] for entry in processes if entry['role'] == 'worker']
+        return {
+            'peak_total_rss_mb': self.peak_total_rss,
+            'peak_worker_rss_mb': max(workers) if workers else None,
+            'processes': processes
+        }
+
+def module_matrix(modules, rng, values, override_fraction):
+    # keyed pairs as the frontend sends them: every pair takes its first module's default value,
+    # except a few pairs customised individually
+    defaults = {module: rng.choice(values) for module in modules}
+    matrix = {}
+    for module1 in modules:
+        for module2 in modules:
+            if module1 != module2:
+                value = rng.choice(values) if rng.random() < override_fraction else defaults[module1]
+                matrix[f'{module1}-{module2}'] = value
+    return matrix
+
+def build_requests(count, mix, modules, populations, generations, islands, seed, result_cache):
+    # the whole request sequence is drawn up front from the seed, so every run sends the same requests
+    rng = random.Random(seed)
+    endpoints = list(mix)
+    weights = [mix[endpoint] for endpoint in endpoints]
+    labels = [f'Module {module}' for module in modules]
+    requests = []
+    for _ in range(count):
+        endpoint = rng.choices(endpoints, weights)[0]
+        if endpoint == 'get-preprocessed-data':
+            requests.append((endpoint, 'GET', None))
+            continue
+        payload = {
+            'population': rng.choice(populations),
+            'generations': rng.choice(generations),
+            'islands': rng.choice(islands),
+            'mutationRate': 0.1,
+            'crossoverRate': 0.5,
+            'interactionMatrix': module_matrix(labels, rng, list(range(0, 65, 5)), 0.1),
+            'informationMatrix': module_matrix(labels, rng, [0, 0, 0, 5, 10, 20, 30], 0.1),
+            'adoptionRate': [0] * 9,
+            'seed': rng.getrandbits(32),
+            'useResultCache': result_cache
+        }
+        requests.append((endpoint, 'POST', json.dumps(payload).encode()))
+    return requests
+
+def send(url, request, timeout):
+    # (endpoint, status or error name, seconds, response bytes)
+    endpoint, method, body = request
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(f'{url}/{endpoint}', data=body, headers=headers, method=method), timeout=timeout) as response:
+            size = len(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        size = len(e.read())
+        status = e.code
+    except OSError as e:
+        size = 0
+        status = type(e.__cause__ if isinstance(e, urllib.error.URLError) and e.__cause__ else e).__name__
+    return endpoint, status, time.perf_counter() - started, size
+
+def percentile(values, q):
+    # nearest-rank percentile of a sorted list
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+def summarize(endpoint, outcomes, elapsed):
+    latencies = sorted(seconds for _, _, seconds, _ in outcomes)
+    statuses = {}
+    for _, status, _, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(count for status, count in statuses.items() if not (status.isdigit() and int(status) < 400))
+    return {
+        'endpoint': endpoint,
+        'requests': len(outcomes),
+        'errors': errors,
+        'error_rate': errors / len(outcomes),
+        'throughput': len(outcomes) / elapsed,
+        'statuses': statuses,
+        'response_bytes': sum(size for _, _, _, size in outcomes) / len(outcomes),
+        'latency': {
+            'mean': sum(latencies) / len(latencies),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1]
+        }
+    }
+
+def run_load(url, requests, concurrency, timeout):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda request: send(url, request, timeout), requests))
+    elapsed = time.perf_counter() - started
+
+    results = [summarize('all', outcomes, elapsed)]
+    for endpoint in ENDPOINTS:
+        endpoint_outcomes = [outcome for outcome in outcomes if outcome[0] == endpoint]
+        if endpoint_outcomes:
+            results.append(summarize(endpoint, endpoint_outcomes, elapsed))
+    return results, elapsed
+
+def compare(results, baseline):
+    # (endpoint, metric, baseline, new, new / baseline) for every endpoint present in both files
+    baseline_by_endpoint = {entry['endpoint']: entry for entry in baseline['results']}
+    rows = []
+    for entry in results['results']:
+        base = baseline_by_endpoint.get(entry['endpoint'])
+        if base is None:
+            continue
+        for metric, old, new in [('throughput', base['throughput'], entry['throughput']),
+                                 ('error_rate', base['error_rate'], entry['error_rate'])] + \
+                                [(q, base['latency'][q], entry['latency'][q]) for q in ('p50', 'p95', 'p99')]:
+            ratio = new / old if old else (1.0 if new == old else float('inf'))
+            rows.append((entry['endpoint'], metric, old, new, ratio))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the GA HTTP API with concurrent requests')
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    parser.add_argument('--pid', type=int, help='process id of the server given with --url, to report its memory')
+    parser.add_argument('--server', choices=('flask', 'gunicorn'), help='server to start (default: gunicorn when installed)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--server-log', default=os.devnull, help='file receiving the output of the started server')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--mix', default='run-ga=4,get-preprocessed-data=1', help='endpoint=weight pairs')
+    parser.add_argument('--populations', default='20,50,100')
+    parser.add_argument('--generations', default='5,10,20')
+    parser.add_argument('--islands', default='1', help='island counts to draw from, above 1 runs use process pools')
+    parser.add_argument('--result-cache', action='store_true', help='let seeded runs be served from the result cache')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the request sequence')
+    parser.add_argument('--timeout', type=float, default=600, help='per-request timeout in seconds')
+    parser.add_argument('--output', default='loadtest_results.json')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url is None:
+        if args.server is None:
+            try:
+                import gunicorn  # noqa: F401
+                args.server = 'gunicorn'
+            except ImportError:
+                args.server = 'flask'
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        server = start_server(args.server, port, args.workers, args.threads, args.server_log)
+    else:
+        url = args.url.rstrip('/')
+
+    try:
+        wait_until_ready(url, server, args.startup_timeout)
+        with urllib.request.urlopen(url + '/get-preprocessed-data', timeout=args.timeout) as response:
+            modules = sorted(int(module) for module in json.load(response)['dependencies'])
+        requests = build_requests(args.requests, parse_mix(args.mix), modules, parse_list(args.populations, int),
+                                  parse_list(args.generations, int), parse_list(args.islands, int), args.seed, args.result_cache)
+
+        pid = server.pid if server is not None else args.pid
+        sampler = MemorySampler(pid, args.server != 'flask').start() if pid is not None and os.path.isdir('/proc') else None
+        results, elapsed = run_load(url, requests, args.concurrency, args.timeout)
+        memory = sampler.stop() if sampler is not None else None
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    output = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'server': args.server if server is not None else args.url,
+            'workers': args.workers if args.server == 'gunicorn' else 1,
+            'threads': args.threads if args.server == 'gunicorn' else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'mix': args.mix,
+            'populations': args.populations,
+            'generations': args.generations,
+            'islands': args.islands,
+            'result_cache': args.result_cache,
+            'seed': args.seed,
+            'elapsed': elapsed
+        },
+        'results': results,
+        'memory': memory
+    }
+
+    for entry in results:
+        latency = entry['latency']
+        print(f"{entry['endpoint']:22} n={entry['requests']:<5} {entry['throughput']:7.2f} req/s  errors {entry['error_rate']:6.1%}  "
+              f"p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  p99 {latency['p99']:.3f}s")
+    if memory is not None:
+        print(f"{'memory':22} peak total {memory['peak_total_rss_mb']:.1f} MB, peak per process " +
+              ', '.join(f"{entry['role']} {entry['peak_rss_mb']:.1f}" for entry in memory['processes']))
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('commit')}):")
+        for endpoint, metric, base, new, ratio in compare(output, baseline):
+            print(f"{endpoint:22} {metric:10} {base:.4f} -> {new:.4f} ({ratio:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,217 @@
 # imports
-from genetic_algorithm import GeneticAlgorithm
-from data_processing import load_data, preprocess_data
+from genetic_algorithm import GeneticAlgorithm, ParameterError, RunCancelled
+from data_snapshot import load_dataset, load_shared_dataset, source_stat
+from island_model import MIGRATION_POLICIES, run_islands
+from result_cache import ResultCache, result_key
+from stopping import StoppingCriteria
+from instrumentation import RunMetrics, registry
+from profiles import freeze_profile, overlay_profile, parse_module_overrides
+from checkpoint import Checkpointer, checkpoint_path, checkpoint_population, load_checkpoint
+import math
 import os
+import random
+import threading
+import time
 
-# Global variables to store preprocessed data
-module_profile = None
-dependencies = {}
-feasible_set = {}
+# Use environment variable or the bundled workbook for the data file path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE_PATH = os.environ.get('DATA_FILE_PATH', os.path.join(current_dir, '..', 'Data', 'data_bank.xlsx'))
 
-def preprocess_data_once():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(current_dir, '..', 'Data', 'data_bank.xlsx')
-    
-    cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced = load_data(file_path)
-    return preprocess_data(cost_profile_inh, resource_util_inh, resource_avail_inh, crash_data_inh, crash_data_out, preced)
+# Local on-disk store of seeded GA results
+result_cache = ResultCache(os.environ.get('RESULT_CACHE_DIR', os.path.join(current_dir, '..', '.cache', 'results')),
+                           int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024)))
+
+# Population checkpoints of long runs, for resuming them and warm-starting new ones
+CHECKPOINT_DIR = os.environ.get('CHECKPOINT_DIR', os.path.join(current_dir, '..', '.cache', 'checkpoints'))
+
+# params that may differ between a checkpointed run and its resumption, e.g. to extend it by more generations
+RESUME_IGNORED_PARAMS = ('generations', 'timeBudget', 'stagnationGenerations', 'stagnationTolerance', 'targetFitness', 'warmStart', 'seed')
+
+# numeric run params as (name, type, default, minimum, maximum), a None default marks a required one;
+# 4 is the smallest population whose halves the contest selection can draw from
+RUN_PARAMS = (
+    ('population', int, None, 4, None),
+    ('generations', int, None, 1, None),
+    ('mutationRate', float, None, 0.0, 1.0),
+    ('crossoverRate', float, None, 0.0, 1.0),
+    ('fitnessCacheSize', int, 10000, 0, None),
+    ('localSearchTopK', int, 0, 0, None),
+    ('localSearchSteps', int, 10, 0, None),
+    ('localSearchFinalSteps', int, 100, 0, None),
+    ('islands', int, 1, 1, None),
+    ('migrationInterval', int, 10, 1, None),
+    ('migrationSize', int, 2, 0, None),
+    ('checkpointInterval', int, 10, 1, None)
+)
+
+# Keep the per-period data in memory-mapped arrays shared by all worker processes (set to 0 to keep it in process memory)
+SHARED_DATA_ARRAYS = os.environ.get('DATA_SHARED_ARRAYS', '1') != '0'
+
+# Process-wide preprocessed dataset, reloaded from its snapshot when the workbook (or sheet directory) changes
+_dataset = None
+_dataset_stat = None
+_dataset_lock = threading.Lock()
+
+def get_dataset():
+    global _dataset, _dataset_stat
+    stat = source_stat(DATA_FILE_PATH)
+    with _dataset_lock:
+        if _dataset is None or _dataset_stat != stat:
+            # the module profile is shared by all concurrent runs, so it is frozen; runs work on overlays of it
+            dataset = load_shared_dataset(DATA_FILE_PATH) if SHARED_DATA_ARRAYS else load_dataset(DATA_FILE_PATH)
+            # modified (the source's mtime in seconds) is the Last-Modified of the responses derived from the dataset
+            _dataset = dict(dataset, module_profile=freeze_profile(dataset['module_profile']), modified=stat[0] / 1e9)
+            _dataset_stat = stat
+        return _dataset
+
+def run_genetic_algorithm(input_params, progress_callback=None, cancel_event=None, dataset=None):
+    # record every run in the process-wide metrics registry exported on /metrics
+    started = time.perf_counter()
+    try:
+        result = run_cached_genetic_algorithm(input_params, progress_callback, cancel_event, dataset)
+    except RunCancelled:
+        registry.observe_run('cancelled', time.perf_counter() - started)
+        raise
+    except Exception:
+        registry.observe_run('failed', time.perf_counter() - started)
+        raise
+
+    record_run(result, time.perf_counter() - started)
+    return result
+
+def record_run(result, seconds):
+    # a cache hit carries the metrics of the run that produced it, which were recorded already
+    fresh = result['result_cache'] != 'hit'
+    registry.observe_run('completed', seconds,
+                         result.get('metrics') if fresh else None,
+                         result['termination']['generations'] if fresh else 0,
+                         result['result_cache'])
+
+def run_cached_genetic_algorithm(input_params, progress_callback=None, cancel_event=None, dataset=None):
+    if dataset is None:
+        dataset = get_dataset()
+
+    # only seeded runs are reproducible, so only those are served from or stored in the result cache;
+    # a wall-clock budget makes the number of generations depend on the machine, so those runs bypass it too,
+    # as do checkpointed runs (a hit would skip writing the checkpoint) and warm starts (the checkpoint may have changed)
+    seed = input_params.get('seed')
+    uncacheable = input_params.get('timeBudget') is not None or input_params.get('checkpointName') or input_params.get('warmStart')
+    if seed is None or uncacheable or not input_params.get('useResultCache', True):
+        result = execute_genetic_algorithm(input_params, progress_callback, cancel_event, dataset)
+        result['result_cache'] = 'bypass'
+        return result
 
-def run_genetic_algorithm(input_params):
-    module_profile, dependencies, feasible_set = preprocess_data_once()
+    validate_run_params(input_params)
+    key = result_key(input_params, dataset['version'])
+    result = result_cache.get(key)
+    if result is not None:
+        # JSON object keys are strings, restore the module numbers
+        result['best_solution'] = {int(module): value for module, value in result['best_solution'].items()}
+        result['result_cache'] = 'hit'
+        return result
 
-    ga = GeneticAlgorithm(module_profile, dependencies, feasible_set, None, None)
-    population_size = int(input_params['population'])
-    mutation_rate = float(input_params['mutationRate'])
-    crossover_rate = float(input_params['crossoverRate'])
-    generations = int(input_params['generations'])
+    result = execute_genetic_algorithm(input_params, progress_callback, cancel_event, dataset)
+    result_cache.put(key, result)
+    result['result_cache'] = 'miss'
+    return result
+
+def numeric_param(input_params, name, cast, default=None, minimum=None, maximum=None):
+    # a numeric request param, which arrives as a string or a number depending on the client
+    value = input_params.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise ParameterError(f"{name} is required")
+        return default
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ParameterError(f"{name} must be {'an integer' if cast is int else 'a number'}, got {value!r}") from None
+    if cast is float and not math.isfinite(value):
+        raise ParameterError(f"{name} must be finite")
+    if minimum is not None and value < minimum:
+        raise ParameterError(f"{name} must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise ParameterError(f"{name} must be at most {maximum}")
+    return value
+
+def validate_run_params(input_params):
+    # the parameter checks that need neither the dataset nor a run, so job and sweep requests are refused up front;
+    # returns the parsed numeric params and seed
+    params = {name: numeric_param(input_params, name, *limits) for name, *limits in RUN_PARAMS}
+    seed = input_params.get('seed')
+    params['seed'] = None if seed is None else numeric_param(input_params, 'seed', int)
+    for name in ('interactionMatrix', 'informationMatrix'):
+        if input_params.get(name) is None:
+            raise ParameterError(f"{name} is required")
+    StoppingCriteria.from_params(input_params)
+    migration_policy = input_params.get('migrationPolicy', 'ring')
+    if migration_policy not in MIGRATION_POLICIES:
+        raise ParameterError(f"Unknown migration policy '{migration_policy}', expected one of {MIGRATION_POLICIES}")
+    names = [input_params.get('checkpointName'), input_params.get('warmStart')]
+    for name in names:
+        if name:
+            checkpoint_path(CHECKPOINT_DIR, name)
+    if names[1] and not os.path.exists(checkpoint_path(CHECKPOINT_DIR, names[1])):
+        raise ParameterError(f"Checkpoint '{names[1]}' not found")
+    if params['islands'] > 1 and any(names):
+        raise ParameterError("Checkpointing and warm starts are not supported with islands")
+    return params
+
+def execute_genetic_algorithm(input_params, progress_callback=None, cancel_event=None, dataset=None):
+    if dataset is None:
+        dataset = get_dataset()
+    params = validate_run_params(input_params)
+
+    # an unseeded run draws a fresh seed, which is returned with the result so the run can be repeated
+    seed = params['seed'] if params['seed'] is not None else random.SystemRandom().getrandbits(32)
+
+    # update_module_duration and moduleOverrides change fields of a per-run overlay, never the shared base profile
+    module_profile = overlay_profile(dataset['module_profile'], parse_module_overrides(input_params.get('moduleOverrides'), dataset['module_profile']))
+    dependencies = dataset['dependencies']
+    feasible_set = dataset['feasible_set']
+    feasibility_index = dataset['feasibility_index']
+
+    ga = GeneticAlgorithm(module_profile, dependencies, feasible_set, None, None, params['fitnessCacheSize'], feasibility_index, dataset.get('catalog'),
+                          random.Random(seed))
+    # per-phase timings and operator counters, returned with the result unless switched off
+    if input_params.get('instrumentation', True):
+        ga.metrics = RunMetrics()
+    ga.local_search_top_k = params['localSearchTopK']
+    ga.local_search_steps = params['localSearchSteps']
+    ga.final_search_steps = params['localSearchFinalSteps']
+    population_size = params['population']
+    mutation_rate = params['mutationRate']
+    crossover_rate = params['crossoverRate']
+    generations = params['generations']
     interaction_degree = input_params['interactionMatrix']
     information_flow = input_params['informationMatrix']
-    adoption_rate = input_params['adoptionRate']
+    islands = params['islands']
+    migration_interval = params['migrationInterval']
+    migration_size = params['migrationSize']
+    migration_policy = input_params.get('migrationPolicy', 'ring')
+    # the time budget counts from here so it covers the whole run, not only the generations
+    stopping = StoppingCriteria.from_params(input_params).start()
 
-    ga.interaction_degree = interaction_degree
-    ga.information_flow = information_flow
+    ga.set_matrices(interaction_degree, information_flow)
 
     # Run the update_module_duration function
     ga.update_module_duration()
-    print("Updated module durations:")
 
-    best_solution, best_fitness, best_product_selection = ga.run(population_size, crossover_rate, mutation_rate, generations)
+    checkpoint, resume, seed_population, checkpoint_info = prepare_checkpointing(ga, input_params, dataset, params['checkpointInterval'])
+
+    island_stats = None
+    if islands > 1:
+        # evolve sub-populations in parallel processes, exchanging their best individuals every migration_interval generations
+        best_solution, best_fitness, best_product_selection, island_stats, cache_stats = run_islands(
+            ga, population_size, crossover_rate, mutation_rate, generations,
+            islands, migration_interval, migration_size, migration_policy,
+            progress_callback=progress_callback, cancel_event=cancel_event, stopping=stopping)
+        lookups = cache_stats['hits'] + cache_stats['misses']
+        fitness_cache_stats = dict(cache_stats, hit_rate=cache_stats['hits'] / lookups if lookups else 0.0)
+    else:
+        best_solution, best_fitness, best_product_selection = ga.run(population_size, crossover_rate, mutation_rate, generations, progress_callback, cancel_event, stopping,
+                                                                     checkpoint, resume, seed_population)
+        fitness_cache_stats = ga.fitness_cache.stats()
     
     for key, value in best_solution.items():
         module_cost = 0
@@ -44,14 +221,50 @@ def run_genetic_algorithm(input_params):
         else:
             module_cost += module_profile[key]['cost'][value[1] - 1]
             module_cost += module_profile[key]['crash cost'][value[1] - 1] * value[2]
-        best_solution[key].append(module_cost)
+        # a new list rather than an append, genes are replaced and never modified in place
+        best_solution[key] = value + [module_cost]
     
     return {
         "best_solution": best_solution,
         "fitness": best_fitness,
-        "product_selection": best_product_selection
+        "product_selection": best_product_selection,
+        "fitness_cache": fitness_cache_stats,
+        "islands": island_stats,
+        "termination": stopping.to_dict(),
+        "metrics": ga.metrics.to_dict(),
+        "checkpoint": checkpoint_info,
+        "seed": seed
     }
 
+def prepare_checkpointing(ga, input_params, dataset, checkpoint_interval):
+    # checkpointName: save the run there every checkpointInterval generations and when it ends
+    # resume: continue from that checkpoint when it exists and was written for the same inputs
+    # warmStart: name of a checkpoint whose population seeds this run, repaired for the current inputs
+    checkpoint = resume = seed_population = None
+    info = None
+
+    name = input_params.get('checkpointName')
+    if name:
+        path = checkpoint_path(CHECKPOINT_DIR, name)
+        fingerprint = result_key({key: value for key, value in input_params.items() if key not in RESUME_IGNORED_PARAMS}, dataset['version'])
+        checkpoint = Checkpointer(path, checkpoint_interval, fingerprint)
+        info = {'name': name, 'resumed_from': None, 'warm_start': None}
+        if input_params.get('resume') and os.path.exists(path):
+            resume = load_checkpoint(path)
+            if resume['fingerprint'] != fingerprint:
+                raise ParameterError(f"Checkpoint '{name}' was written for different inputs, use it as a warmStart instead")
+            info['resumed_from'] = resume['generation']
+
+    warm_start = input_params.get('warmStart')
+    if warm_start and resume is None:
+        path = checkpoint_path(CHECKPOINT_DIR, warm_start)
+        if not os.path.exists(path):
+            raise ParameterError(f"Checkpoint '{warm_start}' not found")
+        seed_population = checkpoint_population(ga, load_checkpoint(path))
+        info = dict(info or {'name': None, 'resumed_from': None}, warm_start=warm_start)
+
+    return checkpoint, resume, seed_population, info
+
 """
 # Example usage
 import pandas as pd
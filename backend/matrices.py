@@ -0,0 +1,90 @@
+import numpy as np
+
+class MatrixError(ValueError):
+    # raised for a malformed interaction or information matrix in a request
+    pass
+
+def module_number(label, name):
+    # "Module 3", "M3" and 3 all name module 3
+    if isinstance(label, (int, np.integer)) and not isinstance(label, bool):
+        return int(label)
+    text = str(label).strip()
+    for prefix in ('Module', 'M'):
+        if text.startswith(prefix):
+            text = text[len(prefix):].strip()
+            break
+    try:
+        return int(text)
+    except ValueError:
+        raise MatrixError(f"{name}: '{label}' is not a module") from None
+
+def cell_value(value, name, row, column):
+    # '-', '', null and NaN (from a DataFrame or array) mark a missing entry
+    if value is None or (isinstance(value, float) and np.isnan(value)) or (isinstance(value, str) and value.strip() in ('', '-')):
+        return np.nan
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise MatrixError(f"{name}: entry ({row}, {column}) is not a number: {value!r}") from None
+    if not np.isfinite(number) or number < 0 or number > 100:
+        raise MatrixError(f"{name}: entry ({row}, {column}) must be a percentage between 0 and 100, got {value!r}")
+    return number
+
+def compile_matrix(value, modules, name='matrix'):
+    # compile a request matrix into a float array over modules (in the given order), NaN where there is no entry;
+    # entry [i, j] is the percentage the key "Module i-Module j" gives, the first module being the one affected.
+    # accepted forms:
+    #   {"Module 1-Module 2": 20, ...}            keyed pairs, as sent by the frontend
+    #   [[null, 20, ...], [20, null, ...], ...]   dense rows and columns in module order
+    #   {"entries": [[1, 2, 20], ...]}            sparse (affected module, other module, value) triples
+    #   a DataFrame or array indexed like the dense form
+    modules = list(modules)
+    position = {module: i for i, module in enumerate(modules)}
+    n = len(modules)
+    matrix = np.full((n, n), np.nan)
+
+    def index(label):
+        module = module_number(label, name)
+        if module not in position:
+            raise MatrixError(f"{name}: unknown module {label!r}")
+        return position[module]
+
+    if hasattr(value, 'columns') and hasattr(value, 'index'):
+        value = value.reindex(index=modules, columns=modules).values
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+
+    if isinstance(value, dict) and 'entries' in value:
+        entries = value['entries']
+        if not isinstance(entries, list):
+            raise MatrixError(f"{name}: entries must be a list of [module, module, value] triples")
+        for entry in entries:
+            if not isinstance(entry, (list, tuple)) or len(entry) != 3:
+                raise MatrixError(f"{name}: entries must be a list of [module, module, value] triples")
+            i, j = index(entry[0]), index(entry[1])
+            matrix[i, j] = cell_value(entry[2], name, entry[0], entry[1])
+    elif isinstance(value, dict):
+        for key, cell in value.items():
+            first, separator, second = str(key).partition('-')
+            if not separator:
+                raise MatrixError(f"{name}: key '{key}' is not of the form 'Module i-Module j'")
+            i, j = index(first), index(second)
+            matrix[i, j] = cell_value(cell, name, first.strip(), second.strip())
+    elif isinstance(value, list):
+        if len(value) != n or any(not isinstance(row, (list, tuple)) or len(row) != n for row in value):
+            raise MatrixError(f"{name}: a dense matrix must be {n} rows of {n} values")
+        try:
+            # numbers and nulls convert in one go, anything else goes through the per-cell checks
+            matrix = np.array(value, dtype=float)
+            invalid = ~np.isnan(matrix) & ~((matrix >= 0) & (matrix <= 100))
+        except (TypeError, ValueError):
+            invalid = np.ones((n, n), dtype=bool)
+            matrix = np.full((n, n), np.nan)
+        for i, j in zip(*np.nonzero(invalid)):
+            matrix[i, j] = cell_value(value[i][j], name, modules[i], modules[j])
+    else:
+        raise MatrixError(f"{name}: expected keyed pairs, a dense list of rows or {{'entries': [...]}}")
+
+    # a module does not interact with itself
+    np.fill_diagonal(matrix, np.nan)
+    return matrix
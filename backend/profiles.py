@@ -0,0 +1,95 @@
+from collections.abc import Mapping
+from matrices import MatrixError, module_number
+
+class ProfileOverrideError(ValueError):
+    # raised for a malformed moduleOverrides request param
+    pass
+
+class FrozenDict(Mapping):
+    # read-only dict; unlike MappingProxyType it pickles, so frozen data can go to worker processes and snapshots
+    __slots__ = ('_data',)
+
+    def __init__(self, data=()):
+        object.__setattr__(self, '_data', dict(data))
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"FrozenDict({self._data!r})"
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenDict is read-only")
+
+    def __reduce__(self):
+        return FrozenDict, (self._data,)
+
+def freeze_profile(module_profile):
+    # the process-wide base profile: read-only per module, with tuples in place of lists
+    return FrozenDict(
+        (module, FrozenDict((field, tuple(value) if isinstance(value, list) else value) for field, value in profile.items()))
+        for module, profile in module_profile.items()
+    )
+
+def overlay_profile(base_profile, overrides=None):
+    # a per-request profile: one small dict per module whose fields start out shared with the base profile;
+    # anything a run changes (durations adjusted for information flow, overrides) replaces a field of the overlay only
+    overrides = overrides or {}
+    return {module: dict(profile, **overrides.get(module, {})) for module, profile in base_profile.items()}
+
+# request field name -> profile field
+OVERRIDE_FIELDS = {'duration': 'duration', 'maxCrash': 'max crash', 'cost': 'cost', 'crashCost': 'crash cost'}
+
+def parse_module_overrides(value, base_profile):
+    # moduleOverrides: {"3": {"duration": [30], "maxCrash": [2]}, ...}; per-option fields take one value per
+    # supplier (a single one for in-house modules), cost is a single number for in-house modules
+    if not value:
+        return {}
+    if not isinstance(value, dict):
+        raise ProfileOverrideError("moduleOverrides must map modules to the fields they override")
+
+    overrides = {}
+    for key, fields in value.items():
+        # module keys are read like the matrix ones: "Module 3", "M3" and "3"
+        try:
+            module = module_number(key, 'moduleOverrides')
+        except MatrixError as e:
+            raise ProfileOverrideError(str(e)) from None
+        if module not in base_profile:
+            raise ProfileOverrideError(f"moduleOverrides: unknown module {key!r}")
+        if not isinstance(fields, dict):
+            raise ProfileOverrideError(f"moduleOverrides: module {module} must map field names to values")
+
+        profile = base_profile[module]
+        overrides[module] = {}
+        for name, field_value in fields.items():
+            if name not in OVERRIDE_FIELDS:
+                raise ProfileOverrideError(f"moduleOverrides: unknown field '{name}', expected one of {sorted(OVERRIDE_FIELDS)}")
+            field = OVERRIDE_FIELDS[name]
+            base_value = profile[field]
+            if isinstance(base_value, tuple):
+                values = field_value if isinstance(field_value, list) else [field_value]
+                if len(values) != len(base_value):
+                    raise ProfileOverrideError(f"moduleOverrides: module {module} {name} needs {len(base_value)} values")
+            else:
+                values = [field_value]
+            try:
+                values = [float(v) for v in values]
+            except (TypeError, ValueError):
+                raise ProfileOverrideError(f"moduleOverrides: module {module} {name} must be numeric") from None
+            if any(v < 0 for v in values) or (field == 'duration' and any(v < 1 for v in values)):
+                raise ProfileOverrideError(f"moduleOverrides: module {module} {name} is out of range")
+            overrides[module][field] = tuple(values) if isinstance(base_value, tuple) else values[0]
+
+        # crashing may never take a module's duration below one period
+        durations = overrides[module].get('duration', profile['duration'])
+        max_crash = overrides[module].get('max crash', profile['max crash'])
+        if any(crash > duration - 1 for duration, crash in zip(durations, max_crash)):
+            raise ProfileOverrideError(f"moduleOverrides: module {module} maxCrash must stay below its duration")
+    return overrides
@@ -0,0 +1,84 @@
+import gzip
+import os
+from datetime import datetime, timezone
+from flask import Response, request
+from werkzeug.http import is_resource_modified
+
+# responses at least this large are gzip-compressed for clients that accept it (0 disables compression)
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+
+RESULT_FORMATS = ('nested', 'columnar')
+
+# columns of a best_solution gene, in the order of the gene list
+SOLUTION_COLUMNS = ('start', 'supplier', 'crash', 'end', 'cost')
+
+class ResultFormatError(ValueError):
+    # raised for an unknown ?format= of a GA result
+    pass
+
+def compress_response(response):
+    # after_request hook: gzip large buffered responses, streams (job events) and 304s are left alone
+    if GZIP_MIN_BYTES <= 0 or response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers or (response.content_length or 0) < GZIP_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings['gzip'] <= 0:
+        return response
+    response.set_data(gzip.compress(response.get_data(), GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def conditional(etag, make_response, last_modified=None):
+    # 304 Not Modified while the client's If-None-Match / If-Modified-Since still match, otherwise make_response();
+    # either way tagged so the client revalidates before reusing its copy. The ETag is weak so it also matches
+    # the gzip-compressed representation
+    if isinstance(last_modified, (int, float)):
+        last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc)
+    if is_resource_modified(request.environ, etag, last_modified=last_modified):
+        response = make_response()
+    else:
+        response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+def requested_result_format():
+    result_format = request.args.get('format', 'nested')
+    if result_format not in RESULT_FORMATS:
+        raise ResultFormatError(f"Unknown format '{result_format}', expected one of {RESULT_FORMATS}")
+    return result_format
+
+def format_result(result, result_format):
+    return columnar_result(result) if result_format == 'columnar' else result
+
+def columnar_result(result):
+    # the schedule, the product selection and the per-generation timings as parallel arrays rather than an object
+    # or list per module, family and generation, which keeps results of large portfolios compact
+    columnar = dict(result, format='columnar')
+
+    best_solution = result.get('best_solution')
+    if best_solution:
+        modules = sorted(best_solution)
+        genes = [best_solution[module] for module in modules]
+        columnar['best_solution'] = {'module': modules, **{name: [gene[k] for gene in genes] for k, name in enumerate(SOLUTION_COLUMNS)}}
+
+    product_selection = result.get('product_selection')
+    if product_selection:
+        selected = [next(iter(products.items())) for products in product_selection.values()]
+        columnar['product_selection'] = {
+            'family': list(product_selection),
+            'product': [product for product, _ in selected],
+            'profit': [values[0] for _, values in selected],
+            'launch': [values[1] for _, values in selected]
+        }
+
+    metrics = result.get('metrics')
+    if metrics and metrics.get('generations'):
+        generations = metrics['generations']
+        columnar['metrics'] = dict(metrics, generations={phase: [generation.get(phase) for generation in generations] for phase in generations[0]})
+
+    return columnar
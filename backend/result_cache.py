@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from data_snapshot import atomic_write
+
+# bump whenever a change to the engine alters the results for identical inputs
+RESULT_CACHE_FORMAT = 5
+
+# request params that do not change the result of a seeded run
+NON_RESULT_PARAMS = ('fitnessCacheSize', 'useResultCache', 'instrumentation', 'name', 'checkpointName', 'checkpointInterval', 'resume')
+
+def _to_json(value):
+    # DataFrames, numpy arrays and numpy scalars as plain JSON values
+    if hasattr(value, 'columns') and hasattr(value, 'index'):
+        return {'index': value.index.tolist(), 'columns': value.columns.tolist(), 'data': value.values.tolist()}
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def canonical_params(input_params):
+    # numeric params arrive as strings or numbers depending on the client, so normalize the ones the GA parses
+    numeric = {
+        'population': int, 'generations': int, 'seed': int, 'islands': int,
+        'migrationInterval': int, 'migrationSize': int, 'stagnationGenerations': int, 'checkpointInterval': int,
+        'localSearchTopK': int, 'localSearchSteps': int, 'localSearchFinalSteps': int,
+        'mutationRate': float, 'crossoverRate': float, 'stagnationTolerance': float, 'targetFitness': float
+    }
+    params = {}
+    for key, value in input_params.items():
+        if key in NON_RESULT_PARAMS or callable(value):
+            continue
+        params[key] = numeric[key](value) if key in numeric and value is not None else value
+    return json.dumps(params, sort_keys=True, separators=(',', ':'), default=_to_json)
+
+def result_key(input_params, dataset_version):
+    payload = f"{RESULT_CACHE_FORMAT}\n{dataset_version}\n{canonical_params(input_params)}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# eviction frees space down to this fraction of max_bytes, so it is not needed again for a while
+LOW_WATER = 0.9
+
+# puts between full scans of the directory, which pick up entries written by other processes sharing it
+RESCAN_PUTS = 100
+
+class ResultCache:
+    # content-addressed store of GA results on local disk, evicting least recently used entries by total size
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # total size of the entries as of the last scan plus the puts since, None until the first scan
+        self.size = None
+        self.puts_since_scan = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # bump the mtime so eviction treats the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, result):
+        path = self.path(key)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        atomic_write(path, lambda f: json.dump(result, f, default=_to_json), 'w')
+
+        # only scan the directory when the tracked size crosses the bound or is due for a rescan
+        self.puts_since_scan += 1
+        if self.size is not None and self.puts_since_scan < RESCAN_PUTS:
+            self.size += os.stat(path).st_size - replaced
+            if self.size <= self.max_bytes:
+                return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+                total += stat.st_size
+
+        # once over its bound, remove the least recently used entries until the cache is back to the low-water mark
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * LOW_WATER:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        self.size = total
+        self.puts_since_scan = 0
@@ -0,0 +1,78 @@
+import time
+from genetic_algorithm import ParameterError
+
+# possible values of StoppingCriteria.reason
+STOP_REASONS = ('max_generations', 'target_fitness', 'stagnation', 'time_budget')
+
+class StoppingCriteria:
+    # termination rules for a GA run besides the generation limit, all optional:
+    #   stagnation_generations: stop once the best fitness improved by no more than tolerance for that many generations
+    #   target_fitness: stop as soon as the best fitness reaches this value
+    #   time_budget: stop once this many wall-clock seconds have passed since start(), keeping the best so far
+    def __init__(self, stagnation_generations=None, tolerance=0.0, target_fitness=None, time_budget=None):
+        self.stagnation_generations = stagnation_generations
+        self.tolerance = tolerance
+        self.target_fitness = target_fitness
+        self.time_budget = time_budget
+        self.started_at = None
+        self.best_fitness = -float('inf')
+        self.stagnant_generations = 0
+        self.generations = 0
+        self.reason = 'max_generations'
+
+    def start(self):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        return self
+
+    def elapsed(self):
+        return 0.0 if self.started_at is None else time.perf_counter() - self.started_at
+
+    def remaining(self):
+        if self.time_budget is None:
+            return None
+        return max(0.0, self.time_budget - self.elapsed())
+
+    def update(self, best_fitness, generations=1):
+        # record the best fitness after another generations generations, returns True when the run should stop
+        self.start()
+        self.generations += generations
+        if best_fitness > self.best_fitness + self.tolerance:
+            self.stagnant_generations = 0
+        else:
+            self.stagnant_generations += generations
+        self.best_fitness = max(self.best_fitness, best_fitness)
+
+        if self.target_fitness is not None and self.best_fitness >= self.target_fitness:
+            self.reason = 'target_fitness'
+        elif self.stagnation_generations is not None and self.stagnant_generations >= self.stagnation_generations:
+            self.reason = 'stagnation'
+        elif self.time_budget is not None and self.elapsed() >= self.time_budget:
+            self.reason = 'time_budget'
+        else:
+            return False
+        return True
+
+    def to_dict(self):
+        return {'reason': self.reason, 'generations': self.generations, 'elapsed': self.elapsed()}
+
+    @classmethod
+    def from_params(cls, input_params):
+        # build from the optional request params, without any of them the run only stops at its generation limit
+        def param(name, cast):
+            value = input_params.get(name)
+            if value is None or value == '':
+                return None
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                raise ParameterError(f"{name} must be {'an integer' if cast is int else 'a number'}, got {value!r}") from None
+
+        stagnation_generations = param('stagnationGenerations', int)
+        target_fitness = param('targetFitness', float)
+        time_budget = param('timeBudget', float)
+        if stagnation_generations is not None and stagnation_generations < 1:
+            raise ParameterError("stagnationGenerations must be at least 1")
+        if time_budget is not None and time_budget <= 0:
+            raise ParameterError("timeBudget must be positive")
+        return cls(stagnation_generations, param('stagnationTolerance', float) or 0.0, target_fitness, time_budget)
@@ -0,0 +1,62 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import registry
+from island_model import pool_context
+from main import get_dataset, record_run, run_cached_genetic_algorithm
+
+# each worker process receives the preprocessed dataset once, when the pool starts
+_worker_dataset = None
+
+def _init_worker(dataset):
+    global _worker_dataset
+    _worker_dataset = dataset
+
+def _run_scenario(params, dataset=None):
+    # a failing scenario is reported in its row instead of failing the whole sweep
+    started = time.perf_counter()
+    try:
+        result = run_cached_genetic_algorithm(params, dataset=dataset if dataset is not None else _worker_dataset)
+        error = None
+    except Exception as e:
+        result, error = None, str(e)
+    return result, error, time.perf_counter() - started
+
+def scenario_row(index, params, result, error, runtime):
+    row = {'scenario': index, 'name': params.get('name'), 'runtime': runtime, 'error': error}
+    if result is not None:
+        row.update({
+            'fitness': result['fitness'],
+            'product_selection': result['product_selection'],
+            'generations': result['termination']['generations'],
+            'termination': result['termination']['reason'],
+            'result_cache': result['result_cache']
+        })
+    return row
+
+def run_sweep(base_params, scenarios, dataset=None, max_workers=None):
+    # run every scenario (a dict of params overriding base_params) against one preprocessed dataset,
+    # in parallel worker processes, and return one compact row per scenario in input order
+    if dataset is None:
+        dataset = get_dataset()
+    runs = [dict(base_params, **scenario) for scenario in scenarios]
+    workers = max(1, min(len(runs), max_workers or os.cpu_count() or 1))
+
+    started = time.perf_counter()
+    if workers == 1:
+        outcomes = [_run_scenario(params, dataset) for params in runs]
+    else:
+        # not forked from this (multithreaded) process, see pool_context
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=_init_worker, initargs=(dataset,)) as pool:
+            outcomes = list(pool.map(_run_scenario, runs))
+
+    rows = []
+    for index, (params, (result, error, runtime)) in enumerate(zip(runs, outcomes)):
+        # runs in worker processes never reach this process's metrics registry, so record them here
+        if error is None:
+            record_run(result, runtime)
+        else:
+            registry.observe_run('failed', runtime)
+        rows.append(scenario_row(index, params, result, error, runtime))
+
+    return {'scenarios': rows, 'workers': workers, 'elapsed': time.perf_counter() - started}
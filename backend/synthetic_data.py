@@ -0,0 +1,129 @@
+# Synthetic scenario generator producing workbooks in the same layout as Data/data_bank.xlsx.
+#
+#   python synthetic_data.py --modules 500 --horizon 520 --products 40 --output ../Data/synthetic_500.xlsx
+#   python synthetic_data.py --modules 2000 --horizon 520 --output ../Data/synthetic_2000   (one CSV per sheet)
+#   python synthetic_data.py --modules 2000 --horizon 520 --format parquet --output ../Data/synthetic_2000
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+def generate_scenario(num_modules=100, num_periods=156, num_products=12, num_families=4, inhouse_fraction=0.5,
+                      max_predecessors=3, num_layers=None, blocked_fraction=0.05, modules_per_product=None, seed=0):
+    # returns the workbook sheets as DataFrames, keyed by sheet name
+    rng = np.random.default_rng(seed)
+    modules = np.arange(1, num_modules + 1)
+    num_inhouse = max(1, int(round(num_modules * inhouse_fraction)))
+    inhouse = modules[:num_inhouse]
+    outsourced = modules[num_inhouse:]
+
+    # modules are spread over dependency layers, durations are sized so the longest chain fits the horizon
+    num_layers = num_layers or max(2, min(8, int(np.sqrt(num_modules))))
+    layer = rng.integers(0, num_layers, num_modules)
+    max_duration = max(4, num_periods // (num_layers + 2))
+    min_duration = max(2, max_duration // 2)
+    periods = [str(p) for p in range(1, num_periods + 1)]
+
+    # in-house modules: cost, crash data and per-period resource usage/availability with blocked windows
+    ideal_duration = rng.integers(min_duration, max_duration + 1, len(inhouse))
+    crash_data_inh = pd.DataFrame({
+        'module': inhouse,
+        'ideal_duration': ideal_duration,
+        'allowable_crash': np.round(ideal_duration * 0.15, 2),
+        'cost_per_crash_period': rng.uniform(2.4e5, 2.6e5, len(inhouse))
+    })
+    cost_profile_inh = pd.DataFrame({'module': inhouse, '1': rng.uniform(4e6, 1.3e7, len(inhouse))})
+
+    utilisation = rng.uniform(0.2, 0.6, (len(inhouse), 1)) * np.ones((1, num_periods))
+    availability = utilisation + rng.uniform(0.05, 0.4, (len(inhouse), num_periods))
+    # resources are unavailable in a few short windows per module rather than in scattered single periods
+    blocked = np.zeros((len(inhouse), num_periods), dtype=bool)
+    for row in range(len(inhouse)):
+        while blocked[row].sum() < blocked_fraction * num_periods:
+            start = rng.integers(num_periods)
+            blocked[row, start:start + rng.integers(2, 7)] = True
+    availability[blocked] = utilisation[blocked] * 0.5
+    resource_util_inh = pd.concat([pd.DataFrame({'module': inhouse}), pd.DataFrame(utilisation, columns=periods)], axis=1)
+    resource_avail_inh = pd.concat([pd.DataFrame({'module': inhouse}), pd.DataFrame(availability, columns=periods)], axis=1)
+
+    # outsourced modules: two or three suppliers, the first one fast and expensive without expediting
+    rows = []
+    for module in outsourced:
+        base_lead_time = rng.integers(min_duration, max_duration + 1)
+        for supplier in range(1, rng.integers(2, 4) + 1):
+            lead_time = int(min(max_duration, base_lead_time + (supplier - 1) * rng.integers(1, 4)))
+            max_exped = 0 if supplier == 1 else int(round(lead_time * 0.15))
+            rows.append({
+                'module': module,
+                'supplier': supplier,
+                'cost': rng.uniform(6e6, 9e6) * (1.0 if supplier == 1 else 0.85),
+                'lead_time': lead_time,
+                'allowable_expediting_time': max_exped,
+                'cost_per_crash_period': 0.0 if max_exped == 0 else rng.uniform(1.6e5, 1.9e5)
+            })
+    crash_data_out = pd.DataFrame(rows, columns=['module', 'supplier', 'cost', 'lead_time', 'allowable_expediting_time', 'cost_per_crash_period'])
+
+    # precedence matrix: row M<i> has a 1 in column M<j> when module i must precede module j
+    labels = [f'M{module}' for module in modules]
+    preced = np.zeros((num_modules, num_modules), dtype=int)
+    for j in range(num_modules):
+        candidates = np.flatnonzero(layer < layer[j])
+        if len(candidates):
+            count = rng.integers(0, min(max_predecessors, len(candidates)) + 1)
+            preced[rng.choice(candidates, count, replace=False), j] = 1
+    precedence = pd.DataFrame(preced, index=labels, columns=labels)
+
+    # product catalog: each product uses a random subset of modules and belongs to one family
+    modules_per_product = modules_per_product or max(2, min(num_modules, 6))
+    catalog = pd.DataFrame(0, index=range(num_products), columns=labels)
+    for p in range(num_products):
+        catalog.iloc[p, rng.choice(num_modules, modules_per_product, replace=False)] = 1
+    catalog.insert(0, 'revenue', rng.choice([2e6, 3e6, 4e6], num_products) * modules_per_product / 6)
+    catalog.insert(0, 'ILT', int(num_periods * 0.35))
+    catalog.insert(0, 'family', [f'K{p % num_families + 1}' for p in range(num_products)])
+    catalog.insert(0, 'product', [f'P{p + 1}' for p in range(num_products)])
+
+    return {
+        'cost_profile_inhouse': cost_profile_inh,
+        'resource_util_inhouse': resource_util_inh,
+        'resource_avail_inhouse': resource_avail_inh,
+        'crash_data_inhouse': crash_data_inh,
+        'crash_data_outsourced': crash_data_out,
+        'precedence_constraints': precedence,
+        'product_catalog': catalog
+    }
+
+def write_workbook(sheets, path):
+    with pd.ExcelWriter(path) as writer:
+        for name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=name, index=(name == 'precedence_constraints'))
+
+def write_sheet_directory(sheets, path, file_format='csv'):
+    # one CSV or Parquet file per sheet, which load_sheets reads much faster than a workbook
+    os.makedirs(path, exist_ok=True)
+    for name, frame in sheets.items():
+        if file_format == 'parquet':
+            frame.to_parquet(os.path.join(path, name + '.parquet'), index=(name == 'precedence_constraints'))
+        else:
+            frame.to_csv(os.path.join(path, name + '.csv'), index=(name == 'precedence_constraints'))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic portfolio workbook')
+    parser.add_argument('--modules', type=int, default=100)
+    parser.add_argument('--horizon', type=int, default=156)
+    parser.add_argument('--products', type=int, default=12)
+    parser.add_argument('--families', type=int, default=4)
+    parser.add_argument('--inhouse-fraction', type=float, default=0.5)
+    parser.add_argument('--blocked-fraction', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=('csv', 'parquet'), default='csv', help='file format of a sheet directory output')
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    sheets = generate_scenario(args.modules, args.horizon, args.products, args.families, args.inhouse_fraction,
+                               blocked_fraction=args.blocked_fraction, seed=args.seed)
+    if args.output.endswith('.xlsx'):
+        write_workbook(sheets, args.output)
+    else:
+        write_sheet_directory(sheets, args.output, args.format)
+    print(f"Wrote {args.modules} modules over {args.horizon} periods to {args.output}")
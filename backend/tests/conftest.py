@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+# the backend modules import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+@pytest.fixture
+def run_payload():
+    # a /run-ga body for the bundled workbook, keyed the way the frontend sends it
+    def payload(**extra):
+        modules = [f'Module {i}' for i in range(1, 13)]
+        body = {
+            'population': 20, 'mutationRate': 0.2, 'crossoverRate': 0.8, 'generations': 5, 'seed': 1,
+            'interactionMatrix': {f'{a}-{b}': 20 for a in modules for b in modules if a != b},
+            'informationMatrix': {f'{a}-{b}': 5 for a in modules for b in modules if a != b},
+            'adoptionRate': [0] * 9, 'useResultCache': False
+        }
+        body.update(extra)
+        return body
+    return payload
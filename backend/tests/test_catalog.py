@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from catalog import DEFAULT_CATALOG, FAMILIES, PRODUCTS, CatalogError, ProductCatalog
+
+def test_from_products():
+    assert DEFAULT_CATALOG.names == list(PRODUCTS)
+    assert DEFAULT_CATALOG.product_modules[0] == [1, 4, 6, 7, 12]
+    assert [len(products) for products in DEFAULT_CATALOG.family_products] == [len(products) for products in FAMILIES.values()]
+
+def test_incidence_ignores_unknown_modules():
+    catalog = ProductCatalog(['A', 'B'], {'K': ['A', 'B']}, [10, 10], [100, 200], [[1, 2], [2, 9]])
+    assert catalog.incidence([2, 1]).tolist() == [[True, True], [True, False]]
+
+def test_tables():
+    catalog = ProductCatalog(['A'], {'K': ['A']}, [10], [100], [[1]], interest_rate=0.01)
+    assert catalog.discount_table(3) == pytest.approx([1, 1.01, 1.01 ** 2])
+    assert catalog.discount_table(3) is catalog.discount_table(3)
+    revenue = catalog.revenue_table(5, 5)
+    # an earlier launch earns a longer annuity
+    assert revenue[0, 0] == pytest.approx(sum(100 * 1.01 ** -k for k in range(5)))
+    assert np.all(np.diff(revenue[0]) < 0)
+
+@pytest.mark.parametrize('names, families, interest_rate', [
+    (['A'], {'K': ['A', 'B']}, 0.01),
+    ([], {}, 0.01),
+    (['A'], {'K': ['A']}, 0),
+])
+def test_invalid_catalogs(names, families, interest_rate):
+    with pytest.raises(CatalogError):
+        ProductCatalog(names, families, [10] * len(names), [100] * len(names), [[1]] * len(names), interest_rate)
@@ -0,0 +1,45 @@
+import json
+import os
+import numpy as np
+import pytest
+from checkpoint import Checkpointer, checkpoint_path, checkpoint_population, load_checkpoint
+from genetic_algorithm import ParameterError
+from test_evaluation import make_ga
+from benchmark import synthetic_dataset
+
+@pytest.fixture(scope='module')
+def dataset():
+    return synthetic_dataset('synthetic-tight', 12, 40)
+
+@pytest.mark.parametrize('name', ['run-1', 'a.b_c', 'x' * 100])
+def test_checkpoint_path(tmp_path, name):
+    assert checkpoint_path(str(tmp_path), name) == os.path.join(str(tmp_path), name + '.npz')
+
+@pytest.mark.parametrize('name', ['', '../etc', '.hidden', 'a/b', 'x' * 101, 5])
+def test_checkpoint_path_rejects(tmp_path, name):
+    with pytest.raises(ParameterError):
+        checkpoint_path(str(tmp_path), name)
+
+def test_round_trip(tmp_path, dataset):
+    ga = make_ga(dataset, 1)
+    population = ga.initialize_population(6)
+    best = population[0]
+    path = str(tmp_path / 'run.npz')
+    Checkpointer(path, fingerprint='abc').save(ga, 7, population, best, 123.5, ['P11'])
+    state = ga.rng.getstate()
+
+    checkpoint = load_checkpoint(path)
+    assert checkpoint['fingerprint'] == 'abc' and checkpoint['generation'] == 7
+    assert checkpoint['best_fitness'] == 123.5 and checkpoint['best_product_selection'] == ['P11']
+    assert checkpoint['rng_state'] == state
+    restored = checkpoint_population(ga, checkpoint)
+    assert len(restored) == len(population) + 1
+    assert restored[0] == {module: list(gene) for module, gene in best.items()}
+    for original, loaded in zip(population, restored[1:]):
+        assert {module: gene[:3] for module, gene in loaded.items()} == {module: list(gene[:3]) for module, gene in original.items()}
+
+def test_format_mismatch(tmp_path):
+    path = str(tmp_path / 'old.npz')
+    np.savez_compressed(path, meta=np.array(json.dumps({'format': 0})))
+    with pytest.raises(ValueError, match='format 0'):
+        load_checkpoint(path)
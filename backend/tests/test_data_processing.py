@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from data_processing import load_sheets
+from data_snapshot import build_dataset
+from synthetic_data import generate_scenario, write_sheet_directory, write_workbook
+
+@pytest.fixture(scope='module')
+def sheets():
+    # Excel keeps 15 significant digits, rounded values survive every format to the last bit
+    return {name: frame.round(6) for name, frame in generate_scenario(25, 60, num_products=6, num_families=2, seed=5).items()}
+
+@pytest.fixture(scope='module')
+def workbook_dataset(sheets, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('workbook') / 'data.xlsx')
+    write_workbook(sheets, path)
+    return build_dataset(path)
+
+def assert_same_dataset(dataset, expected):
+    for key in ('module_profile', 'dependencies', 'feasible_set', 'feasibility_index'):
+        np.testing.assert_equal(dataset[key], expected[key])
+    np.testing.assert_equal(vars(dataset['catalog']), vars(expected['catalog']))
+
+def test_csv_directory_matches_workbook(sheets, workbook_dataset, tmp_path):
+    write_sheet_directory(sheets, str(tmp_path), 'csv')
+    assert_same_dataset(build_dataset(str(tmp_path)), workbook_dataset)
+
+def test_parquet_directory_matches_workbook(sheets, workbook_dataset, tmp_path):
+    pytest.importorskip('pyarrow')
+    write_sheet_directory(sheets, str(tmp_path), 'parquet')
+    assert_same_dataset(build_dataset(str(tmp_path)), workbook_dataset)
+
+def test_parquet_precedence_labelled_by_first_column(sheets, workbook_dataset, tmp_path):
+    # a precedence sheet stored the way a workbook holds it, its labels in the first column
+    pytest.importorskip('pyarrow')
+    write_sheet_directory(sheets, str(tmp_path), 'parquet')
+    sheets['precedence_constraints'].reset_index().to_parquet(str(tmp_path / 'precedence_constraints.parquet'), index=False)
+    preced = load_sheets(str(tmp_path))['precedence_constraints']
+    assert preced.index.tolist() == sheets['precedence_constraints'].index.tolist()
+    assert_same_dataset(build_dataset(str(tmp_path)), workbook_dataset)
+
+def test_missing_sheet(sheets, tmp_path):
+    write_sheet_directory({name: frame for name, frame in sheets.items() if name != 'crash_data_inhouse'}, str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        load_sheets(str(tmp_path))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+import main
+from benchmark import synthetic_dataset
+from genetic_algorithm import GeneticAlgorithm
+from individual import Individual
+from matrices import compile_matrix
+
+@pytest.fixture(scope='module')
+def dataset():
+    return synthetic_dataset('synthetic-tight', 30, 80)
+
+def make_ga(dataset, seed, fitness_cache_size=0):
+    # with the fitness cache off every changed individual goes through the incremental path
+    modules = sorted(dataset['module_profile'])
+    interaction_degree = pd.DataFrame(30, index=modules, columns=modules)
+    information_flow = pd.DataFrame(5, index=modules, columns=modules)
+    module_profile = {module: dict(profile, duration=list(profile['duration'])) for module, profile in dataset['module_profile'].items()}
+    ga = GeneticAlgorithm(module_profile, dataset['dependencies'], dataset['feasible_set'], interaction_degree, information_flow,
+                          fitness_cache_size=fitness_cache_size, feasibility_index=dataset['feasibility_index'], catalog=dataset['catalog'])
+    ga.update_module_duration()
+    ga.rng.seed(seed)
+    return ga
+
+def assert_matches_fresh_evaluation(ga, population):
+    # evaluate_population reuses the values of each individual's last evaluation, fitness_function recomputes
+    # everything from the genes of an unevaluated copy
+    profits, selected, family_profit, family_launch = ga.evaluate_population(population)
+    for i, individual in enumerate(population):
+        fitness, product_selection = ga.fitness_function(Individual(individual))
+        assert profits[i] == pytest.approx(fitness, rel=1e-12)
+        assert ga.product_selection(selected[i], family_profit[i], family_launch[i]) == product_selection
+
+@pytest.mark.parametrize('fitness_cache_size', [0, 10000])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_incremental_evaluation_matches_fresh(dataset, seed, fitness_cache_size):
+    ga = make_ga(dataset, seed, fitness_cache_size)
+    population = ga.initialize_population(20)
+    fitness_scores = ga.evaluate_population(population)[0].tolist()
+
+    # offspring of evaluated parents
+    offspring = ga.crossover(population, fitness_scores, 1.0)
+    assert_matches_fresh_evaluation(ga, offspring)
+
+    # mutants of evaluated offspring, some twice
+    mutants = ga.mutation([individual.copy() for individual in offspring], 1.0)
+    mutants = mutants + ga.mutation([individual.copy() for individual in mutants[:5]], 1.0)
+    assert_matches_fresh_evaluation(ga, mutants)
+
+    # local search moves around an evaluated individual, and the individual the climb ends on
+    best = mutants[int(np.argmax(ga.evaluate_population(mutants)[0]))]
+    assert_matches_fresh_evaluation(ga, ga.neighbours(best))
+    improved, fitness, _ = ga.local_search(best, ga.fitness_function(Individual(best))[0], max_steps=3)
+    assert ga.evaluate_population([improved])[0][0] == pytest.approx(fitness, rel=1e-12)
+    assert_matches_fresh_evaluation(ga, [improved])
+    if fitness_cache_size:
+        assert ga.fitness_cache.hits > 0
+
+def test_changed_individuals_use_fitness_cache(dataset):
+    ga = make_ga(dataset, 1, 10000)
+    population = ga.initialize_population(10)
+    ga.evaluate_population(population)
+    mutants = ga.mutation([individual.copy() for individual in population], 1.0)
+    ga.evaluate_population(mutants)
+    misses = ga.fitness_cache.misses
+
+    # the same genomes again, reached by changing evaluated individuals, are all cache hits
+    again = ga.mutation([individual.copy() for individual in population], 0.0)
+    for individual, mutant in zip(again, mutants):
+        for module in individual:
+            if individual[module] != mutant[module]:
+                individual[module] = list(mutant[module])
+    hits = ga.fitness_cache.hits
+    assert_matches_fresh_evaluation(ga, again)
+    assert ga.fitness_cache.misses == misses
+    assert ga.fitness_cache.hits - hits == len(again)
+
+def run_params(dataset, generations, **extra):
+    modules = sorted(dataset['dependencies'])
+    return dict({
+        'population': 20, 'mutationRate': 0.2, 'crossoverRate': 0.8, 'generations': generations, 'seed': 7,
+        'interactionMatrix': compile_matrix([[30] * len(modules)] * len(modules), modules),
+        'informationMatrix': compile_matrix([[5] * len(modules)] * len(modules), modules),
+        'adoptionRate': [0] * 9, 'useResultCache': False
+    }, **extra)
+
+def test_resumed_checkpoint_matches_uninterrupted_run(dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'CHECKPOINT_DIR', str(tmp_path))
+    dataset = dict(dataset, version='test')
+
+    uninterrupted = main.execute_genetic_algorithm(run_params(dataset, 10), dataset=dataset)
+
+    first = main.execute_genetic_algorithm(run_params(dataset, 6, checkpointName='run', checkpointInterval=4), dataset=dataset)
+    assert first['checkpoint']['resumed_from'] is None
+    resumed = main.execute_genetic_algorithm(run_params(dataset, 10, checkpointName='run', checkpointInterval=4, resume=True), dataset=dataset)
+    assert resumed['checkpoint']['resumed_from'] == 6
+
+    assert resumed['fitness'] == uninterrupted['fitness']
+    assert resumed['best_solution'] == uninterrupted['best_solution']
+    assert resumed['product_selection'] == uninterrupted['product_selection']
@@ -0,0 +1,21 @@
+import numpy as np
+from fitness_cache import FitnessCache
+
+def test_lru_eviction_and_stats():
+    cache = FitnessCache(max_size=2)
+    keys = [FitnessCache.genome_key(np.full((3, 3), i, dtype=np.int32)) for i in range(3)]
+    assert len(set(keys)) == 3
+    cache.put(keys[0], 'a')
+    cache.put(keys[1], 'b')
+    assert cache.get(keys[0]) == 'a'
+    cache.put(keys[2], 'c')
+    # keys[1] was the least recently used
+    assert cache.get(keys[1]) is None
+    assert (cache.get(keys[0]), cache.get(keys[2])) == ('a', 'c')
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'hit_rate': 0.75, 'size': 2, 'max_size': 2}
+
+def test_disabled():
+    cache = FitnessCache(max_size=0)
+    cache.put(b'key', 'a')
+    assert cache.get(b'key') is None
+    assert cache.stats()['size'] == 0
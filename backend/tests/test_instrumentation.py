@@ -0,0 +1,46 @@
+from instrumentation import MetricsRegistry, NULL_METRICS, RunMetrics
+
+def test_run_metrics_per_generation():
+    metrics = RunMetrics()
+    metrics.add_time('initialization', 1.0)
+    for seconds in (0.5, 0.25):
+        metrics.start_generation()
+        metrics.add_time('fitness', seconds)
+        metrics.count('mutations', 2)
+    data = metrics.to_dict()
+    assert data['phases']['initialization'] == 1.0 and data['phases']['fitness'] == 0.75
+    assert [generation['fitness'] for generation in data['generations']] == [0.5, 0.25]
+    assert data['counters']['mutations'] == 4
+
+def test_merge_island_epochs():
+    # epochs of two islands over generations 0-1 and a later epoch at 2-3 add up per generation
+    total = RunMetrics()
+    for offset in (0, 0, 2):
+        epoch = RunMetrics()
+        for _ in range(2):
+            epoch.start_generation()
+            epoch.add_time('crossover', 1.0)
+        epoch.count('crossovers', 3)
+        total.merge(epoch.to_dict(), offset)
+    data = total.to_dict()
+    assert [generation['crossover'] for generation in data['generations']] == [2.0, 2.0, 1.0, 1.0]
+    assert data['counters']['crossovers'] == 9 and data['phases']['crossover'] == 6.0
+
+def test_null_metrics():
+    with NULL_METRICS.phase('fitness'):
+        NULL_METRICS.count('mutations')
+    assert NULL_METRICS.to_dict() is None
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    metrics = RunMetrics()
+    metrics.count('mutations', 5)
+    registry.observe_run('completed', 2.0, metrics.to_dict(), 10, 'miss')
+    registry.observe_run('completed', 1.0, None, 0, 'hit')
+    registry.observe_run('failed', 0.5)
+    text = registry.render({'queued': 1, 'running': 0})
+    for line in ('ga_runs_total{status="completed"} 2', 'ga_runs_total{status="failed"} 1', 'ga_result_cache_total{outcome="hit"} 1',
+                 'ga_run_seconds_total 3.5', 'ga_generations_total 10', 'ga_operator_events_total{event="mutations"} 5',
+                 'ga_jobs{status="queued"} 1'):
+        assert line in text.splitlines()
+    assert 'ga_jobs' not in registry.render()
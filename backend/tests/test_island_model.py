@@ -0,0 +1,68 @@
+import threading
+import pandas as pd
+import pytest
+from benchmark import synthetic_dataset
+from genetic_algorithm import GeneticAlgorithm, ParameterError
+from individual import Individual
+from island_model import migrate, run_islands
+
+@pytest.fixture(scope='module')
+def dataset():
+    return synthetic_dataset('synthetic-loose', 20, 60)
+
+def make_ga(dataset, seed):
+    modules = sorted(dataset['module_profile'])
+    ga = GeneticAlgorithm(dataset['module_profile'], dataset['dependencies'], dataset['feasible_set'],
+                          pd.DataFrame(20, index=modules, columns=modules), None,
+                          feasibility_index=dataset['feasibility_index'], catalog=dataset['catalog'])
+    ga.rng.seed(seed)
+    return ga
+
+def evaluated_populations(ga, islands, size):
+    populations = [ga.initialize_population(size) for _ in range(islands)]
+    fitness_scores = []
+    for i, population in enumerate(populations):
+        profits = ga.evaluate_population(population)[0]
+        order = profits.argsort()[::-1]
+        populations[i] = [population[k] for k in order]
+        fitness_scores.append([profits[k].item() for k in order])
+    return populations, fitness_scores
+
+@pytest.mark.parametrize('policy, expected', [('ring', [2, 2, 2]), ('broadcast', None), ('random', [None, None, None])])
+def test_migrate(dataset, policy, expected):
+    ga = make_ga(dataset, 1)
+    populations, fitness_scores = evaluated_populations(ga, 3, 6)
+    best = [population[:2] for population in populations]
+    received = migrate(populations, fitness_scores, 2, policy, ga.rng)
+
+    assert sum(received) == 4 if policy == 'broadcast' else sum(received) == 6
+    if policy == 'ring':
+        assert received == expected
+        for i in range(3):
+            assert populations[(i + 1) % 3][-2:] == best[i]
+    for population in populations:
+        assert len(population) == 6
+        # migrants are copies that keep their evaluated values
+        for individual in population:
+            assert isinstance(individual, Individual) and individual.evaluated_with is not None
+            assert not individual.changed_modules()
+
+def test_migrate_unknown_policy(dataset):
+    ga = make_ga(dataset, 1)
+    populations, fitness_scores = evaluated_populations(ga, 2, 4)
+    with pytest.raises(ParameterError):
+        migrate(populations, fitness_scores, 1, 'nope')
+
+def test_run_islands_repeats_from_a_thread(dataset):
+    # pools are started from request and job threads, a seeded run gives the same result there as in the main thread
+    def run():
+        return run_islands(make_ga(dataset, 4), 12, 0.8, 0.2, 6, islands=2, migration_interval=3, max_workers=2)
+
+    outcome = []
+    thread = threading.Thread(target=lambda: outcome.append(run()))
+    thread.start()
+    thread.join()
+    best_individual, best_fitness, _, island_stats, _ = run()
+    assert outcome[0][1] == best_fitness
+    assert outcome[0][0] == best_individual
+    assert [stats['migrants_received'] for stats in island_stats] == [2, 2]
@@ -0,0 +1,136 @@
+import os
+import runpy
+import threading
+import time
+import pytest
+from app import create_app
+from conftest import BACKEND_DIR
+from genetic_algorithm import RunCancelled
+from jobs import JobManager
+
+def gunicorn_config(monkeypatch, **env):
+    for name in ('GA_JOBS', 'GA_WORKERS'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'))
+
+def test_gunicorn_config_serves_jobs_from_one_worker(monkeypatch):
+    assert gunicorn_config(monkeypatch)['workers'] == 1
+    assert gunicorn_config(monkeypatch, GA_JOBS='0')['workers'] == 2
+    assert gunicorn_config(monkeypatch, GA_JOBS='0', GA_WORKERS='4')['workers'] == 4
+    with pytest.raises(ValueError):
+        gunicorn_config(monkeypatch, GA_WORKERS='2')
+
+def wait_for(client, job_id, statuses=('completed', 'failed', 'cancelled'), timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} still {job["status"]}')
+
+def test_job_endpoints(monkeypatch, run_payload):
+    monkeypatch.delenv('GA_JOBS', raising=False)
+    # the app as gunicorn.conf.py serves it by default: one process holding every job
+    client = create_app().test_client()
+
+    response = client.post('/jobs', json=run_payload())
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'] == f'/jobs/{job_id}'
+
+    assert wait_for(client, job_id)['status'] == 'completed'
+    result = client.get(f'/jobs/{job_id}/result')
+    assert result.status_code == 200
+    assert result.get_json()['fitness'] == client.post('/run-ga', json=run_payload()).get_json()['fitness']
+    assert client.get(f'/jobs/{job_id}/result', headers={'If-None-Match': result.headers['ETag']}).status_code == 304
+
+    events = client.get(f'/jobs/{job_id}/events').get_data(as_text=True)
+    assert events.count('event: progress') == 5
+    assert events.rstrip().endswith('"status": "completed", "error": null}')
+    # a reconnecting client only gets the events after the last one it saw
+    assert client.get(f'/jobs/{job_id}/events', headers={'Last-Event-ID': '4'}).get_data(as_text=True).startswith('id: 5\n')
+    for last_event_id in ('abc', '', '-7'):
+        assert client.get(f'/jobs/{job_id}/events', headers={'Last-Event-ID': last_event_id}).get_data(as_text=True) == events
+
+    assert 'ga_jobs{status="completed"} 1' in client.get('/metrics').get_data(as_text=True)
+
+def test_cancel_job(run_payload):
+    client = create_app(jobs=True).test_client()
+    job_id = client.post('/jobs', json=run_payload(generations=100000)).get_json()['job_id']
+    wait_for(client, job_id, ('running',))
+    assert client.delete(f'/jobs/{job_id}').status_code == 202
+    assert wait_for(client, job_id)['status'] == 'cancelled'
+    assert client.get(f'/jobs/{job_id}/result').status_code == 409
+    assert client.delete('/jobs/unknown').status_code == 404
+
+def test_jobs_disabled(run_payload):
+    client = create_app(jobs=False).test_client()
+    assert client.post('/jobs', json=run_payload()).status_code == 404
+    assert client.get('/jobs/unknown').status_code == 404
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert 'ga_jobs' not in metrics.get_data(as_text=True)
+
+def blocking_run(release):
+    # a run function that reports progress until cancelled or released
+    def run(params, progress_callback=None, cancel_event=None):
+        generation = 0
+        while not release.is_set():
+            if cancel_event.is_set():
+                raise RunCancelled()
+            progress_callback(generation, 1.0, 1.0)
+            generation += 1
+            time.sleep(0.01)
+        if params.get('fail'):
+            raise ValueError('bad run')
+        return {'fitness': params['value']}
+    return run
+
+def wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+def test_job_manager_cancels_queued_and_running_jobs():
+    release = threading.Event()
+    manager = JobManager(blocking_run(release), max_workers=1)
+    running = manager.submit({'value': 1})
+    queued = manager.submit({'value': 2})
+    wait_until(lambda: running.status == 'running' and running.events)
+
+    # a queued job is cancelled right away and never starts, a running one at its next check
+    manager.cancel(queued.id)
+    assert queued.status == 'cancelled' and queued.started_at is None
+    manager.cancel(running.id)
+    wait_until(lambda: running.finished)
+    assert running.status == 'cancelled'
+    assert running.events[-1] == ('cancelled', {'status': 'cancelled', 'error': None})
+    assert manager.cancel('unknown') is None
+    assert manager.status_counts() == {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0, 'cancelled': 2}
+
+def test_job_manager_reports_failures():
+    release = threading.Event()
+    release.set()
+    manager = JobManager(blocking_run(release), max_workers=1)
+    job = manager.submit({'value': 1, 'fail': True})
+    wait_until(lambda: job.finished)
+    assert (job.status, job.error, job.result) == ('failed', 'bad run', None)
+    assert job.to_dict()['error'] == 'bad run'
+
+def test_job_manager_retains_the_latest_finished_jobs():
+    release = threading.Event()
+    release.set()
+    manager = JobManager(blocking_run(release), max_workers=1, max_finished_jobs=2)
+    jobs = []
+    for value in range(4):
+        jobs.append(manager.submit({'value': value}))
+        wait_until(lambda: jobs[-1].finished)
+    # pruning happens on submit, so the last job's submission dropped all but the two latest finished before it
+    assert [manager.get(job.id) is not None for job in jobs] == [False, True, True, True]
+    manager.submit({'value': 4})
+    assert [manager.get(job.id) is not None for job in jobs] == [False, False, True, True]
+    assert manager.get(jobs[3].id).result == {'fitness': 3}
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from matrices import MatrixError, compile_matrix, module_number
+
+MODULES = [1, 2, 3]
+
+def expected(entries):
+    matrix = np.full((3, 3), np.nan)
+    for (i, j), value in entries.items():
+        matrix[i, j] = value
+    return matrix
+
+@pytest.mark.parametrize('label, module', [(3, 3), (np.int64(3), 3), ('3', 3), ('M3', 3), ('Module 3', 3), (' Module3 ', 3)])
+def test_module_number(label, module):
+    assert module_number(label, 'm') == module
+
+@pytest.mark.parametrize('label', ['X3', 'Module', True, None])
+def test_module_number_rejects(label):
+    with pytest.raises(MatrixError):
+        module_number(label, 'm')
+
+def test_forms_compile_alike():
+    keyed = {'Module 1-Module 2': 20, 'M2-3': '30', 'Module 3-Module 1': '-'}
+    dense = [[None, 20, None], [None, None, 30], ['', None, None]]
+    sparse = {'entries': [[1, 2, 20], ['M2', 'Module 3', 30]]}
+    frame = pd.DataFrame(dense, index=MODULES, columns=MODULES)
+    array = np.array([[np.nan, 20, np.nan], [np.nan, np.nan, 30], [np.nan] * 3])
+    for value in (keyed, dense, sparse, frame, array):
+        np.testing.assert_array_equal(compile_matrix(value, MODULES), expected({(0, 1): 20, (1, 2): 30}))
+
+def test_diagonal_is_dropped():
+    np.testing.assert_array_equal(compile_matrix([[5, 5, 5]] * 3, MODULES), expected({(i, j): 5 for i in range(3) for j in range(3) if i != j}))
+
+def test_modules_in_given_order():
+    np.testing.assert_array_equal(compile_matrix({'Module 1-Module 2': 20}, [2, 1, 3]), expected({(1, 0): 20}))
+
+@pytest.mark.parametrize('value, message', [
+    ({'Module 1': 20}, "key 'Module 1' is not of the form"),
+    ({'Module 1-Module 9': 20}, 'unknown module'),
+    ({'Module 1-Module 2': 'lots'}, 'is not a number'),
+    ({'Module 1-Module 2': 120}, 'between 0 and 100'),
+    ([[None, 20, None], [None, None, -1], [None, None, None]], 'between 0 and 100'),
+    ([[None, 'x', None], [None, None, 1], [None, None, None]], 'is not a number'),
+    ([[1, 2], [3, 4]], 'must be 3 rows of 3 values'),
+    ({'entries': [[1, 2]]}, 'triples'),
+    ({'entries': 'all'}, 'triples'),
+    (42, 'expected keyed pairs'),
+])
+def test_invalid_matrices(value, message):
+    with pytest.raises(MatrixError, match=message):
+        compile_matrix(value, MODULES, 'interactionMatrix')
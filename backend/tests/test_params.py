@@ -0,0 +1,51 @@
+import pytest
+from app import create_app
+from genetic_algorithm import ParameterError
+from main import validate_run_params
+
+INVALID = [
+    ({'population': None}, 'population is required'),
+    ({'population': 'many'}, "population must be an integer, got 'many'"),
+    ({'population': 2}, 'population must be at least 4'),
+    ({'generations': 0}, 'generations must be at least 1'),
+    ({'mutationRate': 1.5}, 'mutationRate must be at most 1.0'),
+    ({'crossoverRate': 'high'}, "crossoverRate must be a number, got 'high'"),
+    ({'seed': 'abc'}, "seed must be an integer, got 'abc'"),
+    ({'islands': 0}, 'islands must be at least 1'),
+    ({'localSearchTopK': -1}, 'localSearchTopK must be at least 0'),
+    ({'interactionMatrix': None}, 'interactionMatrix is required'),
+    ({'stagnationGenerations': 'ten'}, "stagnationGenerations must be an integer, got 'ten'"),
+    ({'timeBudget': -1}, 'timeBudget must be positive'),
+    ({'migrationPolicy': 'nope'}, "Unknown migration policy 'nope'"),
+]
+
+@pytest.fixture(scope='module')
+def client():
+    return create_app(jobs=True).test_client()
+
+def without_none(body):
+    return {key: value for key, value in body.items() if value is not None}
+
+@pytest.mark.parametrize('override, message', INVALID)
+def test_invalid_params_get_400(client, run_payload, override, message):
+    body = without_none(run_payload(**override))
+    for path in ('/run-ga', '/jobs'):
+        response = client.post(path, json=body)
+        assert response.status_code == 400, path
+        assert response.get_json()['error'].startswith(message)
+
+    # a sweep is refused before any of its scenarios runs
+    assert client.post('/sweep', json=dict(run_payload(), scenarios=[{'generations': 2}, override])).status_code == 400
+
+def test_rejected_job_is_not_queued(client, run_payload):
+    client.post('/jobs', json=run_payload(population='many'))
+    assert 'ga_jobs{status="queued"} 0' in client.get('/metrics').get_data(as_text=True)
+
+def test_params_parsed_from_strings(run_payload):
+    params = validate_run_params(run_payload(population='30', mutationRate='0.25', seed='7', islands='2'))
+    assert (params['population'], params['mutationRate'], params['seed'], params['islands']) == (30, 0.25, 7, 2)
+    # optional params take their defaults
+    assert (params['localSearchTopK'], params['migrationInterval'], params['checkpointInterval']) == (0, 10, 10)
+    assert validate_run_params(without_none(run_payload(seed=None)))['seed'] is None
+    with pytest.raises(ParameterError):
+        validate_run_params(run_payload(mutationRate=float('nan')))
@@ -0,0 +1,55 @@
+import pytest
+from profiles import ProfileOverrideError, freeze_profile, overlay_profile, parse_module_overrides
+
+@pytest.fixture
+def base_profile():
+    return freeze_profile({
+        3: {'type': 'inhouse', 'supplier': None, 'duration': [10.0], 'cost': 100.0, 'max crash': [2.0], 'crash cost': [5.0]},
+        4: {'type': 'outsourced', 'supplier': [1, 2], 'duration': [8.0, 6.0], 'cost': [50.0, 70.0], 'max crash': [1.0, 1.0], 'crash cost': [3.0, 4.0]}
+    })
+
+@pytest.mark.parametrize('key', ['3', 'M3', 'Module 3', ' Module3 ', 3])
+def test_module_keys_read_like_matrix_labels(base_profile, key):
+    assert parse_module_overrides({key: {'cost': 120}}, base_profile) == {3: {'cost': 120.0}}
+
+@pytest.mark.parametrize('key, message', [('X3', "'X3' is not a module"), ('M', "'M' is not a module"), ('M9', "unknown module 'M9'")])
+def test_bad_module_keys(base_profile, key, message):
+    with pytest.raises(ProfileOverrideError, match=message):
+        parse_module_overrides({key: {'cost': 120}}, base_profile)
+
+def test_freeze_profile(base_profile):
+    profile = base_profile[4]
+    assert profile['duration'] == (8.0, 6.0)
+    with pytest.raises(TypeError):
+        profile['cost'] = 1
+    with pytest.raises(AttributeError):
+        profile.extra = 1
+
+def test_overlay_leaves_base_untouched(base_profile):
+    overlay = overlay_profile(base_profile, {3: {'cost': 150.0}})
+    assert overlay[3]['cost'] == 150.0 and base_profile[3]['cost'] == 100.0
+    overlay[4]['duration'] = [9, 7]
+    assert base_profile[4]['duration'] == (8.0, 6.0)
+    # unchanged fields are shared with the base profile
+    assert overlay[4]['crash cost'] is base_profile[4]['crash cost']
+
+def test_overrides_per_module_type(base_profile):
+    overrides = parse_module_overrides({'4': {'duration': [9, 7], 'cost': [60, 80], 'maxCrash': [1, 0]}, 'M3': {'duration': 12, 'crashCost': '6'}}, base_profile)
+    assert overrides == {4: {'duration': (9.0, 7.0), 'cost': (60.0, 80.0), 'max crash': (1.0, 0.0)}, 3: {'duration': (12.0,), 'crash cost': (6.0,)}}
+
+@pytest.mark.parametrize('value, message', [
+    ('cheap', 'must map modules'),
+    ({'3': 'cheap'}, 'must map field names'),
+    ({'3': {'price': 1}}, "unknown field 'price'"),
+    ({'4': {'duration': [9]}}, 'needs 2 values'),
+    ({'3': {'cost': 'free'}}, 'must be numeric'),
+    ({'3': {'cost': -1}}, 'out of range'),
+    ({'3': {'duration': 0.5}}, 'out of range'),
+    ({'3': {'maxCrash': 10}}, 'maxCrash must stay below its duration'),
+])
+def test_invalid_overrides(base_profile, value, message):
+    with pytest.raises(ProfileOverrideError, match=message):
+        parse_module_overrides(value, base_profile)
+
+def test_no_overrides(base_profile):
+    assert parse_module_overrides(None, base_profile) == {}
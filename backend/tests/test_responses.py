@@ -0,0 +1,74 @@
+import gzip
+import pytest
+from flask import Flask, jsonify
+from app import create_app
+from responses import GZIP_MIN_BYTES, columnar_result, compress_response, conditional
+
+@pytest.fixture(scope='module')
+def client():
+    return create_app(jobs=False).test_client()
+
+@pytest.fixture
+def small_app():
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.route('/sized/<int:size>')
+    def sized(size):
+        return jsonify({'data': 'x' * size})
+
+    @app.route('/tagged')
+    def tagged():
+        return conditional('v1', lambda: jsonify({'data': 1}), 1700000000)
+
+    return app.test_client()
+
+def test_etag_revalidation(client):
+    response = client.get('/get-preprocessed-data')
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('W/"')
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    not_modified = client.get('/get-preprocessed-data', headers={'If-None-Match': response.headers['ETag']})
+    assert not_modified.status_code == 304 and not_modified.data == b''
+    assert not_modified.headers['ETag'] == response.headers['ETag']
+    assert client.get('/get-preprocessed-data', headers={'If-None-Match': 'W/"other"'}).status_code == 200
+
+def test_last_modified(small_app):
+    response = small_app.get('/tagged')
+    assert response.headers['Last-Modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+    assert small_app.get('/tagged', headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    assert small_app.get('/tagged', headers={'If-Modified-Since': 'Mon, 13 Nov 2023 00:00:00 GMT'}).status_code == 200
+
+def test_gzip_for_large_responses(small_app):
+    large = small_app.get(f'/sized/{GZIP_MIN_BYTES}', headers={'Accept-Encoding': 'gzip'})
+    assert large.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in large.headers['Vary']
+    assert gzip.decompress(large.data) == small_app.get(f'/sized/{GZIP_MIN_BYTES}').data
+
+    assert 'Content-Encoding' not in small_app.get('/sized/10', headers={'Accept-Encoding': 'gzip'}).headers
+    # clients that do not accept gzip still learn the response varies on it
+    plain = small_app.get(f'/sized/{GZIP_MIN_BYTES}')
+    assert 'Content-Encoding' not in plain.headers and 'Accept-Encoding' in plain.headers['Vary']
+
+def test_columnar_result():
+    result = {
+        'fitness': 10.0,
+        'best_solution': {2: [5, 1, 0, 9, 100.0], 1: [0, None, 1, 4, 50.0]},
+        'product_selection': {'K1': {'P11': [3.0, 12]}, 'K2': {'P22': [7.0, 20]}},
+        'metrics': {'counters': {'mutations': 3}, 'generations': [{'evaluation': 0.1, 'crossover': 0.2}, {'evaluation': 0.3, 'crossover': 0.4}]}
+    }
+    columnar = columnar_result(result)
+    assert columnar['format'] == 'columnar' and columnar['fitness'] == 10.0
+    assert columnar['best_solution'] == {'module': [1, 2], 'start': [0, 5], 'supplier': [None, 1], 'crash': [1, 0], 'end': [4, 9], 'cost': [50.0, 100.0]}
+    assert columnar['product_selection'] == {'family': ['K1', 'K2'], 'product': ['P11', 'P22'], 'profit': [3.0, 7.0], 'launch': [12, 20]}
+    assert columnar['metrics'] == {'counters': {'mutations': 3}, 'generations': {'evaluation': [0.1, 0.3], 'crossover': [0.2, 0.4]}}
+    # the nested result is left as it was
+    assert result['best_solution'][1] == [0, None, 1, 4, 50.0]
+
+def test_result_format_parameter(client, run_payload):
+    nested = client.post('/run-ga', json=run_payload()).get_json()
+    columnar = client.post('/run-ga?format=columnar', json=run_payload()).get_json()
+    assert columnar['fitness'] == nested['fitness']
+    assert columnar['best_solution']['module'] == sorted(int(module) for module in nested['best_solution'])
+    assert client.post('/run-ga?format=xml', json=run_payload()).status_code == 400
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pytest
+from result_cache import LOW_WATER, ResultCache, canonical_params, result_key
+
+def entry(size):
+    return {'fitness': 1.0, 'padding': 'x' * size}
+
+def entry_size(cache, key):
+    return os.stat(cache.path(key)).st_size
+
+def test_get_and_put(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get('ab12') is None
+    cache.put('ab12', {'fitness': 3.5, 'best': np.arange(3)})
+    assert cache.get('ab12') == {'fitness': 3.5, 'best': [0, 1, 2]}
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 6)
+    keys = [f'{i:02d}key' for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.put(key, entry(1000))
+        os.utime(cache.path(key), (1000 + i, 1000 + i))
+    cache.get(keys[0])
+
+    # over the bound, eviction goes down to the low-water mark of 90%, here room for three entries
+    cache.max_bytes = int(3 * entry_size(cache, keys[0]) / LOW_WATER) + 1
+    cache.put('05key', entry(1000))
+    assert [key for key in keys if cache.get(key) is not None] == [keys[0], keys[4]]
+    assert cache.get('05key') is not None
+    assert cache.size <= cache.max_bytes * LOW_WATER
+
+def test_tracks_size_between_scans(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.put('aa', entry(100))
+    first = entry_size(cache, 'aa')
+    cache.put('bb', entry(100))
+    cache.put('aa', entry(300))
+    assert cache.size == entry_size(cache, 'aa') + entry_size(cache, 'bb')
+    assert cache.size > 2 * first
+
+def test_key_ignores_number_spelling_and_non_result_params():
+    params = {'population': 50, 'mutationRate': 0.2, 'seed': 1, 'fitnessCacheSize': 10}
+    spelled = {'population': '50', 'mutationRate': '0.2', 'seed': '1', 'useResultCache': True}
+    assert canonical_params(params) == canonical_params(spelled)
+    assert result_key(params, 'v1') == result_key(spelled, 'v1')
+    assert result_key(params, 'v1') != result_key(params, 'v2')
+    assert result_key(params, 'v1') != result_key(dict(params, seed=2), 'v1')
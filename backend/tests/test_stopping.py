@@ -0,0 +1,52 @@
+import pytest
+from genetic_algorithm import ParameterError
+from stopping import StoppingCriteria
+
+def test_runs_to_the_generation_limit_by_default():
+    stopping = StoppingCriteria().start()
+    assert not any(stopping.update(fitness) for fitness in range(100))
+    assert stopping.to_dict()['reason'] == 'max_generations'
+    assert stopping.remaining() is None
+
+def test_target_fitness():
+    stopping = StoppingCriteria(target_fitness=10)
+    assert not stopping.update(9)
+    assert stopping.update(10)
+    assert (stopping.reason, stopping.generations) == ('target_fitness', 2)
+
+def test_stagnation_within_tolerance():
+    stopping = StoppingCriteria(stagnation_generations=3, tolerance=0.5)
+    assert not stopping.update(10)
+    # improvements no larger than the tolerance count as stagnant
+    assert not stopping.update(10.5)
+    assert not stopping.update(10.2)
+    assert not stopping.update(12)
+    assert [stopping.update(12.4) for _ in range(3)] == [False, False, True]
+    assert stopping.reason == 'stagnation'
+
+def test_stagnation_counts_epochs_as_generations():
+    stopping = StoppingCriteria(stagnation_generations=10)
+    assert not stopping.update(5, generations=5)
+    assert stopping.update(5, generations=10)
+    assert stopping.generations == 15
+
+def test_time_budget(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('stopping.time.perf_counter', lambda: now[0])
+    stopping = StoppingCriteria(time_budget=2).start()
+    now[0] = 101.5
+    assert stopping.remaining() == 0.5
+    assert not stopping.update(1)
+    now[0] = 103.0
+    assert stopping.remaining() == 0.0
+    assert stopping.update(1)
+    assert stopping.reason == 'time_budget'
+
+def test_from_params():
+    stopping = StoppingCriteria.from_params({'stagnationGenerations': '5', 'stagnationTolerance': '0.1', 'targetFitness': 7, 'timeBudget': ''})
+    assert (stopping.stagnation_generations, stopping.tolerance, stopping.target_fitness, stopping.time_budget) == (5, 0.1, 7.0, None)
+
+@pytest.mark.parametrize('params', [{'stagnationGenerations': 0}, {'stagnationGenerations': 'x'}, {'timeBudget': 0}, {'targetFitness': 'high'}])
+def test_from_params_rejects(params):
+    with pytest.raises(ParameterError):
+        StoppingCriteria.from_params(params)
@@ -0,0 +1,29 @@
+import threading
+import pytest
+from app import create_app
+
+@pytest.fixture(scope='module')
+def client():
+    return create_app(jobs=False).test_client()
+
+def test_sweep_runs_scenarios_in_worker_processes(client, run_payload):
+    scenarios = [{'name': 'low', 'mutationRate': 0.1}, {'name': 'fail', 'moduleOverrides': {'999': {'cost': 1}}}, {'name': 'seed', 'seed': 2}]
+    outcome = []
+    # as under a request thread
+    thread = threading.Thread(target=lambda: outcome.append(client.post('/sweep', json=dict(run_payload(), scenarios=scenarios))))
+    thread.start()
+    thread.join()
+    response = outcome[0]
+    assert response.status_code == 200
+    rows = response.get_json()['scenarios']
+    assert [row['name'] for row in rows] == ['low', 'fail', 'seed']
+
+    single = client.post('/run-ga', json=run_payload(mutationRate=0.1)).get_json()
+    assert rows[0]['error'] is None and rows[0]['fitness'] == single['fitness']
+    # a scenario failing in its worker is reported in its row
+    assert rows[1]['error'] and rows[1].get('fitness') is None
+    assert rows[2]['fitness'] == client.post('/run-ga', json=run_payload(seed=2)).get_json()['fitness']
+
+def test_sweep_rejects_bad_scenario_lists(client, run_payload):
+    assert client.post('/sweep', json=dict(run_payload(), scenarios=[])).status_code == 400
+    assert client.post('/sweep', json=run_payload()).status_code == 400
@@ -0,0 +1,9 @@
+# WSGI entry point for a pre-fork server:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# With preload_app the master process imports this module once, so the dataset is loaded before the workers
+# are forked and every worker starts warm.
+from app import create_app
+
+app = create_app(warm_up=True)